@@ -0,0 +1,136 @@
+import os
+import tempfile
+from dotenv import load_dotenv
+
+# ✅ Load .env variables once for every module that reads settings
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value.strip().lower() in ("1", "true", "yes", "on") if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# ✅ Embedding model shared by retrieval and evaluators
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+
+# ✅ PDF retrieval (chunking + FAISS index)
+CHUNK_SIZE = _env_int("CHUNK_SIZE", 800)              # characters per chunk
+CHUNK_OVERLAP = _env_int("CHUNK_OVERLAP", 150)        # characters shared by neighbouring chunks
+EMBED_BATCH_SIZE = _env_int("EMBED_BATCH_SIZE", 64)   # chunks per encode() call
+RETRIEVAL_TOP_K = _env_int("RETRIEVAL_TOP_K", 6)      # candidate chunks pulled from the index
+CONTEXT_TOKEN_BUDGET = _env_int("CONTEXT_TOKEN_BUDGET", 1200)  # max tokens of PDF context per prompt
+
+# ✅ PDF extraction / OCR process pool
+PDF_WORKERS = _env_int("PDF_WORKERS", os.cpu_count() or 1)
+PDF_PAGES_PER_TASK = _env_int("PDF_PAGES_PER_TASK", 4)  # pages a worker handles per pdf open
+OCR_RESOLUTION = _env_int("OCR_RESOLUTION", 300)        # DPI used when rendering pages for Tesseract
+
+# ✅ Upstream call timeouts (seconds) for the async /ask path
+LLM_TIMEOUT = _env_float("LLM_TIMEOUT", 30.0)
+SEARCH_TIMEOUT = _env_float("SEARCH_TIMEOUT", 5.0)
+
+# ✅ Upstream resilience (Groq / SerpAPI) → pooled keep-alive HTTP, bulkheads, budgeted retries, circuit breakers
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 100)        # per pool (sync + async pools are separate)
+HTTP_MAX_KEEPALIVE = _env_int("HTTP_MAX_KEEPALIVE", 20)             # idle connections kept open per pool
+HTTP_KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)    # seconds an idle connection is kept
+LLM_MAX_CONCURRENCY = _env_int("LLM_MAX_CONCURRENCY", 32)           # in-flight Groq calls per process
+SEARCH_MAX_CONCURRENCY = _env_int("SEARCH_MAX_CONCURRENCY", 16)     # in-flight SerpAPI calls per process
+UPSTREAM_MAX_ATTEMPTS = _env_int("UPSTREAM_MAX_ATTEMPTS", 3)        # first try + retries, all within the call timeout
+RETRY_BASE_DELAY = _env_float("RETRY_BASE_DELAY", 0.1)              # seconds; backoff is full-jitter exponential
+RETRY_BUDGET_RATIO = _env_float("RETRY_BUDGET_RATIO", 0.2)          # retries allowed per call, on average
+BREAKER_FAILURE_THRESHOLD = _env_int("BREAKER_FAILURE_THRESHOLD", 5)  # consecutive failures that open a breaker
+BREAKER_RESET_SECONDS = _env_float("BREAKER_RESET_SECONDS", 30.0)     # open → one trial call after this
+
+# ✅ Web route execution → "hedged" races SerpAPI against the LLM fallback, "sequential" waits for search first
+WEB_EXECUTION_MODE = os.getenv("WEB_EXECUTION_MODE", "hedged")  # hedged | sequential
+WEB_HEDGE_DELAY = _env_float("WEB_HEDGE_DELAY", 1.0)  # seconds search gets alone before the LLM branch starts (0 → both at once)
+WEB_DEADLINE = _env_float("WEB_DEADLINE", 8.0)        # seconds until the first acceptable web-route result, then give up
+
+# ✅ Per-session state (PDF context, retrieval index, conversation memory)
+SESSION_MAX_COUNT = _env_int("SESSION_MAX_COUNT", 1000)
+SESSION_MAX_BYTES = _env_int("SESSION_MAX_BYTES", 512 * 1024 * 1024)  # evict LRU sessions above this
+SESSION_DIR = os.getenv("SESSION_DIR", "")  # set to share sessions between uvicorn workers via disk
+SESSION_DISK_MAX_COUNT = _env_int("SESSION_DISK_MAX_COUNT", SESSION_MAX_COUNT)  # sessions kept in SESSION_DIR
+SESSION_DISK_TTL = _env_float("SESSION_DISK_TTL", 24 * 3600.0)  # seconds since a session's last write before it's deleted
+
+# ✅ Conversation memory → recent turns verbatim + rolling summary, all inside one prompt budget
+PROMPT_TOKEN_BUDGET = _env_int("PROMPT_TOKEN_BUDGET", 1800)    # history + PDF context + question per LLM prompt
+HISTORY_TOKEN_BUDGET = _env_int("HISTORY_TOKEN_BUDGET", 500)   # max share of the prompt for summary + recent turns
+MEMORY_RECENT_TURNS = _env_int("MEMORY_RECENT_TURNS", 4)       # turns kept verbatim before being folded into the summary
+SUMMARY_MAX_TOKENS = _env_int("SUMMARY_MAX_TOKENS", 200)       # hard cap on the rolling summary
+
+# ✅ Local knowledge base (BM25 + dense hybrid index over knowledgeBase/), consulted before web search
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+KB_DIR = os.getenv("KB_DIR", os.path.join(_PROJECT_ROOT, "knowledgeBase"))  # "" disables
+KB_INDEX_DIR = os.getenv("KB_INDEX_DIR", os.path.join(tempfile.gettempdir(), "flashquery_kb"))  # "" → memory only
+KB_EXTENSIONS = tuple(e.strip().lower() for e in os.getenv("KB_EXTENSIONS", ".txt,.md").split(",") if e.strip())
+KB_TOP_K = _env_int("KB_TOP_K", 4)                          # fused chunks offered to the prompt
+KB_MIN_SIMILARITY = _env_float("KB_MIN_SIMILARITY", 0.5)    # best chunk's cosine needed to answer locally
+KB_TOKEN_BUDGET = _env_int("KB_TOKEN_BUDGET", 800)          # max tokens of knowledge-base context per prompt
+KB_REFRESH_SECONDS = _env_float("KB_REFRESH_SECONDS", 30.0)  # min seconds between mtime scans for changed files
+
+# ✅ Semantic answer cache in front of the LLM / web search
+ANSWER_CACHE_ENABLED = _env_bool("ANSWER_CACHE_ENABLED", True)
+ANSWER_CACHE_SIZE = _env_int("ANSWER_CACHE_SIZE", 2048)
+ANSWER_CACHE_TTL = _env_float("ANSWER_CACHE_TTL", 3600.0)           # seconds
+ANSWER_CACHE_THRESHOLD = _env_float("ANSWER_CACHE_THRESHOLD", 0.92)  # min cosine similarity for a semantic hit
+
+# ✅ SerpAPI result cache (TTL + request coalescing + stale-while-revalidate)
+SEARCH_CACHE_SIZE = _env_int("SEARCH_CACHE_SIZE", 1024)
+SEARCH_CACHE_TTL = _env_float("SEARCH_CACHE_TTL", 60.0)              # seconds a result is fresh
+SEARCH_CACHE_STALE_TTL = _env_float("SEARCH_CACHE_STALE_TTL", 300.0)  # extra seconds a stale result may be served
+SEARCH_CACHE_SWR = _env_bool("SEARCH_CACHE_SWR", True)
+
+# ✅ Shared embedding service (micro-batching + embedding LRU)
+EMBED_MAX_WAIT_MS = _env_float("EMBED_MAX_WAIT_MS", 5.0)  # how long a batch waits for more callers
+EMBED_CACHE_SIZE = _env_int("EMBED_CACHE_SIZE", 20000)    # cached vectors (~1.5 KB each for MiniLM)
+
+# ✅ Toxicity filter (micro-batched toxic-bert)
+TOXICITY_MODEL_NAME = os.getenv("TOXICITY_MODEL_NAME", "unitary/toxic-bert")
+TOXICITY_MAX_BATCH = _env_int("TOXICITY_MAX_BATCH", 32)            # texts per forward pass
+TOXICITY_MAX_WAIT_MS = _env_float("TOXICITY_MAX_WAIT_MS", 10.0)    # how long a batch waits for more callers
+TOXICITY_MAX_TOKENS = _env_int("TOXICITY_MAX_TOKENS", 512)         # model input limit
+TOXICITY_MAX_CHUNKS = _env_int("TOXICITY_MAX_CHUNKS", 8)           # windows scored per text, rest truncated
+
+# ✅ Online evaluation → a sample of served answers scored by knowledgeBase/Evaluators off the request path
+EVAL_SAMPLE_RATE = _env_float("EVAL_SAMPLE_RATE", 0.05)    # share of answers evaluated (0 disables)
+EVAL_QUEUE_SIZE = _env_int("EVAL_QUEUE_SIZE", 1000)        # pending records; beyond this they are dropped, /ask never waits
+EVAL_BATCH_SIZE = _env_int("EVAL_BATCH_SIZE", 32)          # records scored together (one encode / toxicity pass)
+EVAL_BATCH_WAIT = _env_float("EVAL_BATCH_WAIT", 2.0)       # seconds a worker waits for a batch to fill
+EVAL_WORKERS = _env_int("EVAL_WORKERS", 1)
+EVAL_SCORE_THRESHOLD = _env_float("EVAL_SCORE_THRESHOLD", 0.6)  # hybrid / hallucination scores below this are flagged
+EVAL_WINDOW = _env_int("EVAL_WINDOW", 1000)                # recent scores per route kept for percentiles
+EVAL_DIR = os.getenv("EVAL_DIR", "")                       # per-record store + summary.json; "" → in-memory aggregates only
+EVAL_STORE_TEXT = _env_bool("EVAL_STORE_TEXT", False)      # also store question / answer text (user data) in the records
+EVAL_MAX_FILE_BYTES = _env_int("EVAL_MAX_FILE_BYTES", 50 * 1024 * 1024)  # evaluations.jsonl rotates past this
+EVAL_BACKUPS = _env_int("EVAL_BACKUPS", 5)                 # rotated files kept (evaluations.jsonl.1 ... .N)
+
+# ✅ Startup / readiness
+WARMUP_COMPONENTS = [c.strip() for c in os.getenv("WARMUP_COMPONENTS", "llm,search,knowledge_base").split(",") if c.strip()]
+READY_REQUIRES = [c.strip() for c in os.getenv("READY_REQUIRES", "").split(",") if c.strip()]  # /ready → 503 until these are warm
+STARTUP_BUDGET_SECONDS = _env_float("STARTUP_BUDGET_SECONDS", 1.0)  # import + startup time target per replica
+
+# ✅ Content-addressed disk cache (extracted text, per-page OCR, chunk embeddings)
+CONTENT_CACHE_DIR = os.getenv("CONTENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "flashquery_cache"))  # "" disables
+CONTENT_CACHE_MAX_BYTES = _env_int("CONTENT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+
+# ✅ Upload limits (streaming ingestion)
+UPLOAD_CHUNK_BYTES = _env_int("UPLOAD_CHUNK_BYTES", 1024 * 1024)        # bytes buffered per temp-file write while spooling
+MAX_UPLOAD_BYTES = _env_int("MAX_UPLOAD_BYTES", 100 * 1024 * 1024)     # larger uploads → 413
+MAX_PDF_PAGES = _env_int("MAX_PDF_PAGES", 1000)                         # more pages → 413
+MAX_CONCURRENT_INGESTIONS = _env_int("MAX_CONCURRENT_INGESTIONS", 4)    # more parallel uploads → 429
+
+# ✅ Structured logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")   # DEBUG also logs prompt / result text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
@@ -0,0 +1,67 @@
+import contextvars
+import json
+import logging
+import sys
+import time
+
+from Backend.core.config import LOG_LEVEL, LOG_FORMAT
+
+# ✅ Request id → set once per request by the middleware, copied into worker threads automatically
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    One line per event: JSON by default, or "key=value" text with LOG_FORMAT=text.
+    Extra fields passed through log_event() are merged into the record.
+    """
+
+    def __init__(self, fmt: str = "json"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", request_id_var.get()),
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        if self.fmt == "json":
+            return json.dumps(payload, ensure_ascii=False, default=str)
+        return " ".join(f"{k}={v}" for k, v in payload.items())
+
+
+def _configure():
+    root = logging.getLogger("flashquery")
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL.upper())
+        root.propagate = False
+    return root
+
+
+_root = _configure()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return _root.getChild(name)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """
+    Structured log call. The level check comes first, so a disabled level
+    costs one comparison and nothing is formatted.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields, "request_id": request_id_var.get()})
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
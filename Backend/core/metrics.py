@@ -0,0 +1,151 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds) → covers cache hits (~ms) up to slow LLM / OCR calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def add_collector(self, collect):
+        """
+        collect() -> list of (name, help, value) or (name, help, value, labels)
+        gauges read at scrape time; one name may appear with several label sets.
+        """
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        gauges = {}  # name -> lines; all samples of one metric must be adjacent in the output
+        for collect in self._collectors:
+            for name, help_text, value, *labels in collect():
+                family = gauges.setdefault(name, [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+                family.append(f"{name}{_format_labels(_label_key(labels[0]) if labels else ())} {value}")
+        for family in gauges.values():
+            lines.extend(family)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ✅ Hot-path metrics shared across modules
+STAGE_SECONDS = registry.histogram(
+    "flashquery_stage_seconds",
+    "Latency of pipeline stages (routing, serpapi, clean_serp_output, llm_invoke, pdf_extraction, ocr_page, ...)",
+)
+REQUEST_SECONDS = registry.histogram("flashquery_request_seconds", "End-to-end HTTP request latency by route")
+ROUTE_DECISIONS = registry.counter("flashquery_route_decisions_total", "Which branch answered a question (pdf, grammar, kb, web, fallback)")
+CACHE_EVENTS = registry.counter("flashquery_cache_events_total", "Cache lookups by cache and result")
+UPSTREAM_ERRORS = registry.counter("flashquery_upstream_errors_total", "Failed upstream calls by upstream and kind")
+UPSTREAM_RETRIES = registry.counter(
+    "flashquery_upstream_retries_total",
+    "Retry decisions by upstream and result (retried, budget_exhausted)",
+)
+HEDGE_OUTCOMES = registry.counter(
+    "flashquery_hedge_outcomes_total",
+    "Hedged web-route races by winner (web, llm, none) and whether the LLM branch was started",
+)
+EVAL_RECORDS = registry.counter(
+    "flashquery_eval_records_total",
+    "Online evaluation records by result (sampled, dropped, evaluated, failed)",
+)
+EVAL_SCORES = registry.histogram(
+    "flashquery_eval_score",
+    "Online evaluation scores by route and score (hybrid, hallucination, toxicity)",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+PROMPT_TOKENS = registry.histogram(
+    "flashquery_prompt_tokens",
+    "Estimated tokens per LLM prompt (history + PDF context + question)",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096),
+)
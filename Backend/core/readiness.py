@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+
+from Backend.core.config import STARTUP_BUDGET_SECONDS
+from Backend.core.logger import get_logger, log_event
+
+logger = get_logger("readiness")
+
+
+class Readiness:
+    """
+    Tracks heavy components (LLM client, SerpAPI, embedding model, PDF pool, ...)
+    that are created lazily or during warm-up, plus how long startup took.
+
+    A component is "ready" once its probe says so, whether it was warmed
+    up in the background or loaded on demand by the first request.
+    """
+
+    def __init__(self, budget_seconds: float = STARTUP_BUDGET_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.phases = {}
+        self._components = {}
+
+    def register(self, name: str, loader, probe):
+        """
+        loader: blocking callable that builds the component.
+        probe: cheap callable returning True once the component exists.
+        """
+        self._components[name] = {"loader": loader, "probe": probe, "state": "cold", "seconds": None, "error": None}
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = round(seconds, 4)
+
+    def _warm_one(self, name: str):
+        component = self._components[name]
+        component["state"] = "warming"
+        started = time.perf_counter()
+        try:
+            component["loader"]()
+            component["state"] = "ready"
+        except Exception as e:
+            component.update(state="failed", error=str(e))
+            log_event(logger, logging.ERROR, "warmup_failed", component=name, error=str(e))
+        component["seconds"] = round(time.perf_counter() - started, 4)
+        log_event(logger, logging.INFO, "warmup_done", component=name, state=component["state"], seconds=component["seconds"])
+
+    async def warm(self, names):
+        names = [n for n in names if n in self._components]
+        started = time.perf_counter()
+        await asyncio.gather(*(asyncio.to_thread(self._warm_one, n) for n in names))
+        self.record("warmup", time.perf_counter() - started)
+
+    def component_state(self, name: str) -> str:
+        component = self._components[name]
+        if component["state"] != "failed" and component["probe"]():
+            component["state"] = "ready"
+        return component["state"]
+
+    def is_ready(self, required) -> bool:
+        return all(self.component_state(n) == "ready" for n in required if n in self._components)
+
+    def report(self, required=()) -> dict:
+        components = {}
+        for name, component in self._components.items():
+            components[name] = {
+                "state": self.component_state(name),
+                "warmup_seconds": component["seconds"],
+                "error": component["error"],
+            }
+        startup = sum(v for k, v in self.phases.items() if k != "warmup")
+        return {
+            "ready": self.is_ready(required),
+            "required": list(required),
+            "components": components,
+            "startup": {
+                "phases": self.phases,
+                "seconds": round(startup, 4),
+                "budget_seconds": self.budget_seconds,
+                "within_budget": startup <= self.budget_seconds,
+            },
+        }
+
+
+readiness = Readiness()
@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from Backend.core.config import (
+    UPSTREAM_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_BUDGET_RATIO,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import UPSTREAM_ERRORS, UPSTREAM_RETRIES
+
+logger = get_logger("resilience")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, upstream: str):
+        super().__init__(f"{upstream} circuit is open")
+        self.upstream = upstream
+
+
+class UpstreamBusy(TimeoutError):
+    """Raised when no concurrency slot for an upstream frees up in time."""
+
+
+class CircuitBreaker:
+    """
+    closed → open after `failure_threshold` consecutive failures; open calls
+    fail fast. After `reset_seconds` one trial call is let through (half-open):
+    success closes the breaker, failure opens it for another period.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            recovered = self._state != self.CLOSED
+            self._state, self._failures, self._probing = self.CLOSED, 0, False
+        if recovered:
+            log_event(logger, logging.WARNING, "circuit_closed", upstream=self.name)
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.OPEN or (self._state == self.CLOSED and self._failures < self.failure_threshold):
+                return
+            self._state, self._opened_at, self._probing = self.OPEN, time.monotonic(), False
+            self.opened += 1
+            failures = self._failures
+        log_event(logger, logging.WARNING, "circuit_opened", upstream=self.name,
+                  consecutive_failures=failures, reset_s=self.reset_seconds)
+
+    def abandon(self):
+        # A cancelled trial call says nothing about the upstream → let the next caller probe
+        with self._lock:
+            self._probing = False
+
+
+class RetryBudget:
+    """
+    Caps retries at `ratio` of calls: every call deposits `ratio` tokens (up to
+    `max_tokens`), every retry spends one. During an outage retries stop once
+    the bucket is empty instead of multiplying the load on the upstream.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def _retryable(error: Exception) -> bool:
+    # Upstream-health errors only: timeouts, connection errors, 429 and 5xx. Other 4xx and errors
+    # raised while handling a response (a ValueError from _process_response, ...) would fail the
+    # same way against a healthy upstream → neither retried nor counted by the breaker
+    if _is_timeout(error) or _is_connection_error(error):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _is_timeout(error: Exception) -> bool:
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(error).__name__.lower()
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # httpx (SerpAPI) errors and the Groq SDK's APIConnectionError share no base class
+    return (isinstance(error, (ConnectionError, httpx.NetworkError, httpx.RemoteProtocolError))
+            or "connection" in type(error).__name__.lower())
+
+
+class Upstream:
+    """
+    Guards one upstream (Groq, SerpAPI): at most `max_concurrency` calls in
+    flight, retries with full-jitter backoff while the retry budget and the
+    call's overall `timeout` allow, and a circuit breaker that fails fast
+    (CircuitOpenError) while the upstream is unhealthy.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_attempts: int = UPSTREAM_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY, budget: RetryBudget = None, breaker: CircuitBreaker = None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker(name)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._async_slots = None
+        self._async_slots_loop = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def _admit(self):
+        if not self.breaker.allow():
+            UPSTREAM_ERRORS.inc(upstream=self.name, kind="circuit_open")
+            raise CircuitOpenError(self.name)
+
+    def record_failure(self, error: Exception) -> str:
+        # Also for failures after a successful acall(), e.g. a stream dying half-way
+        if _retryable(error):
+            self.breaker.failure()
+            kind = "timeout" if _is_timeout(error) else "error"
+        else:
+            kind = "rejected"
+        UPSTREAM_ERRORS.inc(upstream=self.name, kind=kind)
+        return kind
+
+    def _failed(self, error: Exception, attempt: int, remaining: float) -> float | None:
+        """
+        Records a failed attempt; returns the backoff before the next one,
+        or None when the error should be raised.
+        """
+        kind = self.record_failure(error)
+        if kind == "rejected":
+            self.breaker.abandon()  # a half-open trial call that got a 4xx lets the next caller probe
+            return None
+        if attempt >= self.max_attempts or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        delay = random.uniform(0, self.base_delay * 2 ** (attempt - 1))
+        if delay >= remaining:
+            return None
+        if not self.budget.withdraw():
+            UPSTREAM_RETRIES.inc(upstream=self.name, result="budget_exhausted")
+            return None
+        UPSTREAM_RETRIES.inc(upstream=self.name, result="retried")
+        log_event(logger, logging.INFO, "upstream_retry", upstream=self.name, attempt=attempt, kind=kind,
+                  backoff_ms=round(delay * 1000, 1), error=str(error))
+        return delay
+
+    def _track(self, delta: int):
+        with self._lock:
+            self._in_flight += delta
+
+    def call(self, fn, *args, timeout: float):
+        """
+        Sync call. Each attempt is bounded by the client's own timeout;
+        `timeout` bounds slot waiting and decides whether a retry still fits.
+        """
+        deadline = time.monotonic() + timeout
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            self._admit()
+            attempt += 1
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._busy(timeout)
+            self._track(1)
+            try:
+                result = fn(*args)
+            except Exception as e:
+                delay = self._failed(e, attempt, deadline - time.monotonic())
+                if delay is None:
+                    raise
+            else:
+                self.breaker.success()
+                return result
+            finally:
+                self._track(-1)
+                self._slots.release()
+            time.sleep(delay)
+
+    def _busy(self, timeout: float):
+        # Our own limit, not the upstream's fault → no breaker failure, no retry
+        self.breaker.abandon()
+        UPSTREAM_ERRORS.inc(upstream=self.name, kind="busy")
+        raise UpstreamBusy(f"no free {self.name} slot within {timeout}s")
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        # One semaphore per event loop (benchmarks and tests may run several)
+        loop = asyncio.get_running_loop()
+        if self._async_slots_loop is not loop:
+            self._async_slots, self._async_slots_loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._async_slots
+
+    @asynccontextmanager
+    async def slot(self, timeout: float):
+        """
+        Holds one concurrency slot; waits at most `timeout` for it (UpstreamBusy).
+        Streams hold a slot for as long as they are read and open via acall(slot=False).
+        """
+        semaphore = self._async_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self._busy(timeout)
+        self._track(1)
+        try:
+            yield
+        finally:
+            self._track(-1)
+            semaphore.release()
+
+    async def _attempt(self, fn, args, deadline: float, slot: bool):
+        loop = asyncio.get_running_loop()
+        if not slot:
+            return await asyncio.wait_for(fn(*args), deadline - loop.time())
+        async with self.slot(deadline - loop.time()):
+            return await asyncio.wait_for(fn(*args), deadline - loop.time())
+
+    async def acall(self, fn, *args, timeout: float, slot: bool = True):
+        """
+        Async call: `fn(*args)` is awaited with whatever is left of `timeout`,
+        so slot waiting, all attempts and backoffs together stay within it.
+        slot=False skips the concurrency limit (the caller already holds a slot()).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            self._admit()
+            attempt += 1
+            try:
+                if deadline <= loop.time():
+                    raise asyncio.TimeoutError()
+                result = await self._attempt(fn, args, deadline, slot)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except UpstreamBusy:
+                raise
+            except Exception as e:
+                delay = self._failed(e, attempt, deadline - loop.time())
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.success()
+            return result
+
+    def state(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "retry_budget_tokens": round(self.budget.tokens, 2),
+        }
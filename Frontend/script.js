@@ -11,6 +11,7 @@ const BASE_URL = "http://localhost:8000"; // ✅ Updated to  backend URL
 let currentChatId = null;
 let chatHistory = JSON.parse(localStorage.getItem("flashquery_history")) || [];
 let pdfContext = "";
+let sessionId = null;
 
 // ✅ Microphone Handler
 const micButton = document.querySelector(".mic-btn");
@@ -41,12 +42,14 @@ if (fileInput) {
     formData.append("file", file);
 
     try {
-      const res = await fetch(`${BASE_URL}/upload`, {
+      const uploadUrl = sessionId ? `${BASE_URL}/upload?session_id=${sessionId}` : `${BASE_URL}/upload`;
+      const res = await fetch(uploadUrl, {
         method: "POST",
         body: formData
       });
       const data = await res.json();
       pdfContext = data.content;
+      sessionId = data.session_id || sessionId;
       addMessage("ai", `✅ PDF uploaded and processed successfully.`);
     } catch (err) {
       console.error("File Upload Error:", err);
@@ -93,10 +96,11 @@ function handleSend() {
   fetch(`${BASE_URL}/ask`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ question: userText, context: pdfContext || null })
+    body: JSON.stringify({ question: userText, context: pdfContext || null, session_id: sessionId })
   })
     .then(res => res.json())
     .then(data => {
+      sessionId = data.session_id || sessionId;
       const aiText = data.answer || "Sorry, I couldn't understand that.";
       setTimeout(() => {
         chatWindow.removeChild(thinking);
@@ -0,0 +1,214 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from Backend.core.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_THRESHOLD,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import CACHE_EVENTS
+from knowledgeBase.Evaluators.embedding_service import embedding_service
+
+logger = get_logger("answer_cache")
+
+_CONTRACTIONS = {
+    "what's": "what is", "who's": "who is", "where's": "where is", "when's": "when is",
+    "how's": "how is", "it's": "it is", "that's": "that is", "there's": "there is",
+    "can't": "cannot", "won't": "will not", "don't": "do not", "doesn't": "does not",
+}
+_CONTRACTION_PATTERN = re.compile(r"\b(" + "|".join(re.escape(c) for c in _CONTRACTIONS) + r")\b")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Canonical form used as the exact-match key:
+    "What's X?" and "what is x" map to the same string. Symbols inside the
+    question are kept ("2+2" ≠ "2*2", "C++" ≠ "C#"); only case, whitespace
+    and trailing ?.! are ignored.
+    """
+    text = text.lower().replace("’", "'")
+    text = _CONTRACTION_PATTERN.sub(lambda m: _CONTRACTIONS[m.group(1)], text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?.! ")
+
+
+class _ScopeVectors:
+    """
+    Prompt embeddings of one scope in a preallocated matrix (rows 0..n-1),
+    so a semantic lookup is a single matrix-vector product. Removal moves
+    the last row into the freed one; capacity doubles when full.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.matrix = np.empty((capacity, dim), dtype="float32")
+        self.prompts = []  # row -> normalized prompt
+        self.rows = {}     # normalized prompt -> row
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def add(self, normalized: str, vector: np.ndarray):
+        row = self.rows.get(normalized)
+        if row is None:
+            row = len(self.prompts)
+            if row == len(self.matrix):
+                grown = np.empty((2 * len(self.matrix), self.matrix.shape[1]), dtype="float32")
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.prompts.append(normalized)
+            self.rows[normalized] = row
+        self.matrix[row] = vector
+
+    def discard(self, normalized: str):
+        row = self.rows.pop(normalized, None)
+        if row is None:
+            return
+        last = self.prompts.pop()
+        if row < len(self.prompts):
+            self.matrix[row] = self.matrix[len(self.prompts)]
+            self.prompts[row] = last
+            self.rows[last] = row
+
+    def best(self, query: np.ndarray) -> tuple[str, float]:
+        scores = self.matrix[:len(self.prompts)] @ query
+        row = int(np.argmax(scores))
+        return self.prompts[row], float(scores[row])
+
+
+class AnswerCache:
+    """
+    Answer cache in front of the LLM / web branches.
+
+    Lookups try the normalized prompt first, then fall back to cosine
+    similarity against cached prompts in the same scope. Scopes keep PDF
+    answers tied to the document they were generated from.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_CACHE_THRESHOLD, enabled: bool = ANSWER_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.enabled = enabled
+        self._entries = OrderedDict()  # (scope, normalized) -> entry
+        self._scopes = {}               # scope -> _ScopeVectors of its normalized prompts
+        self._lock = threading.RLock()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        # The embedding service caches by text, so get() + put() encode a question once
+        return embedding_service.encode(normalized)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        scope, normalized = key
+        vectors = self._scopes.get(scope)
+        if vectors is not None:
+            vectors.discard(normalized)
+            if not vectors:
+                del self._scopes[scope]
+
+    def _hit(self, key, entry, semantic: bool) -> str:
+        self._entries.move_to_end(key)
+        if semantic:
+            self.hits_semantic += 1
+        else:
+            self.hits_exact += 1
+        CACHE_EVENTS.inc(cache="answer", result="hit_semantic" if semantic else "hit_exact")
+        self.saved_seconds += entry["latency"]
+        return entry["answer"]
+
+    def _miss(self):
+        CACHE_EVENTS.inc(cache="answer", result="miss")
+        with self._lock:
+            self.misses += 1
+
+    def get(self, prompt: str, scope: str = "global"):
+        if not self.enabled:
+            return None
+        normalized = normalize_prompt(prompt)
+        now = time.time()
+
+        with self._lock:
+            key = (scope, normalized)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry["expires"] > now:
+                    return self._hit(key, entry, semantic=False)
+                self._remove(key)
+            candidates = len(self._scopes.get(scope, ()))
+
+        if not candidates:
+            self._miss()
+            return None
+
+        try:
+            query = self._embed(normalized)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "answer_cache_embedding_error", error=str(e))
+            self._miss()
+            return None
+
+        with self._lock:
+            vectors = self._scopes.get(scope)
+            if vectors:
+                best, score = vectors.best(query)
+                key = (scope, best)
+                entry = self._entries[key]
+                if score >= self.threshold and entry["expires"] > now:
+                    return self._hit(key, entry, semantic=True)
+        self._miss()
+        return None
+
+    def put(self, prompt: str, answer: str, latency: float, scope: str = "global", ttl: float = None):
+        # Apologies / "no answer" fallbacks are transient failures, never cache them
+        if not self.enabled or not answer or answer.startswith("⚠️"):
+            return
+        normalized = normalize_prompt(prompt)
+        try:
+            vector = self._embed(normalized)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "answer_cache_embedding_error", error=str(e))
+            return
+        with self._lock:
+            key = (scope, normalized)
+            self._remove(key)
+            self._entries[key] = {
+                "answer": answer,
+                "latency": latency,
+                "expires": time.time() + (self.ttl if ttl is None else min(ttl, self.ttl)),
+            }
+            vectors = self._scopes.get(scope)
+            if vectors is None:
+                vectors = self._scopes[scope] = _ScopeVectors(len(vector))
+            vectors.add(normalized, vector)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_exact + self.hits_semantic + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_exact + self.hits_semantic) / lookups, 4) if lookups else 0.0,
+                "saved_latency_seconds": round(self.saved_seconds, 3),
+            }
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from Backend.core.config import CONTENT_CACHE_DIR, CONTENT_CACHE_MAX_BYTES
+from Backend.core.metrics import CACHE_EVENTS
+
+_KINDS = ("docs", "ocr", "emb")
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def ocr_cache_path(directory: str, page_hash: str) -> str:
+    # Shared with PDF worker processes, which read OCR hits straight from disk
+    return os.path.join(directory, "ocr", f"{page_hash}.txt")
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ContentCache:
+    """
+    Persistent, content-addressed cache on local disk:
+
+        docs/<file sha256>.txt      extracted text of a whole PDF
+        ocr/<page image sha256>.txt  Tesseract output for one rendered page
+        emb/<text sha256>.json/.npy  chunks + embeddings (.npy opened memory-mapped)
+
+    Entries are evicted least-recently-used (by mtime, refreshed on hit)
+    once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str = CONTENT_CACHE_DIR, max_bytes: int = CONTENT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = {}  # path -> [size, last_used]
+        self._total = 0
+        self._scanned = False
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            for kind in _KINDS:
+                os.makedirs(os.path.join(directory, kind), exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    @property
+    def ocr_dir(self):
+        return self.directory or None
+
+    def _scan(self):
+        # Deferred until the first write so a big cache directory doesn't slow down startup
+        if self._scanned:
+            return
+        self._scanned = True
+        for kind in _KINDS:
+            root = os.path.join(self.directory, kind)
+            for name in os.listdir(root):
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                if path in self._files:
+                    continue
+                stat = os.stat(path)
+                self._files[path] = [stat.st_size, stat.st_mtime]
+                self._total += stat.st_size
+
+    def _path(self, kind: str, key: str, ext: str) -> str:
+        return os.path.join(self.directory, kind, f"{key}{ext}")
+
+    # ---------------------------------------------------------------
+    # Bookkeeping
+    def touch(self, *paths: str):
+        now = time.time()
+        with self._lock:
+            for path in paths:
+                if path in self._files:
+                    self._files[path][1] = now
+        for path in paths:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+
+    def _register(self, *paths: str):
+        now = time.time()
+        with self._lock:
+            self._scan()
+            for path in paths:
+                size = os.path.getsize(path)
+                old = self._files.get(path)
+                self._total += size - (old[0] if old else 0)
+                self._files[path] = [size, now]
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for path, (size, _) in sorted(self._files.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._total -= size
+            del self._files[path]
+
+    def _hit(self, hit: bool, kind: str):
+        CACHE_EVENTS.inc(cache=f"content_{kind}", result="hit" if hit else "miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # ---------------------------------------------------------------
+    # Extracted document text
+    def get_text(self, file_hash: str):
+        if not self.enabled:
+            return None
+        path = self._path("docs", file_hash, ".txt")
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            self._hit(False, "docs")
+            return None
+        self._hit(True, "docs")
+        self.touch(path)
+        return text
+
+    def put_text(self, file_hash: str, text: str):
+        if not self.enabled:
+            return
+        path = self._path("docs", file_hash, ".txt")
+        _atomic_write(path, text.encode("utf-8"))
+        self._register(path)
+
+    # ---------------------------------------------------------------
+    # Per-page OCR output (looked up by workers, recorded here)
+    def put_ocr(self, page_hash: str, text: str):
+        CACHE_EVENTS.inc(cache="content_ocr", result="miss")
+        if not self.enabled:
+            return
+        path = ocr_cache_path(self.directory, page_hash)
+        _atomic_write(path, text.encode("utf-8"))
+        self._register(path)
+
+    def touch_ocr(self, page_hash: str):
+        CACHE_EVENTS.inc(cache="content_ocr", result="hit")
+        if self.enabled:
+            self.touch(ocr_cache_path(self.directory, page_hash))
+
+    # ---------------------------------------------------------------
+    # Chunk embeddings
+    def get_embeddings(self, key: str):
+        """
+        Returns (chunks, vectors) with vectors memory-mapped read-only, or None.
+        """
+        if not self.enabled:
+            return None
+        meta_path, vec_path = self._path("emb", key, ".json"), self._path("emb", key, ".npy")
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                chunks = json.load(f)
+            vectors = np.load(vec_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            self._hit(False, "emb")
+            return None
+        self._hit(True, "emb")
+        self.touch(meta_path, vec_path)
+        return chunks, vectors
+
+    def put_embeddings(self, key: str, chunks: list[str], vectors: np.ndarray):
+        if not self.enabled:
+            return
+        meta_path, vec_path = self._path("emb", key, ".json"), self._path("emb", key, ".npy")
+        tmp = f"{vec_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.asarray(vectors, dtype="float32"))
+        os.replace(tmp, vec_path)
+        # Chunks last → a reader that finds the .json also finds matching vectors
+        _atomic_write(meta_path, json.dumps(chunks, ensure_ascii=False).encode("utf-8"))
+        self._register(vec_path, meta_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self.enabled:
+                self._scan()
+            return {
+                "enabled": self.enabled,
+                "files": len(self._files),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+content_cache = ContentCache()
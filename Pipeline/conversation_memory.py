@@ -0,0 +1,100 @@
+import re
+
+from Backend.core.config import HISTORY_TOKEN_BUDGET, SUMMARY_MAX_TOKENS
+from Pipeline.retriever import estimate_tokens
+
+SUMMARY_PROMPT_PREFIX = "Update the running summary of this conversation"
+
+# Questions that only make sense with the earlier turns ("what about its price?", "explain that again")
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|he|she|him|her|his|previous|above|earlier|"
+    r"again|more|elaborate|continue|also|same|else|other|there|then|why)\b"
+)
+# Elliptical openers ("and germany?", "what about france", "how about in 2020")
+_FOLLOW_UP_OPENER = re.compile(r"^\s*(and|or|but|so|what about|how about)\b")
+
+
+def is_follow_up(question: str) -> bool:
+    q = question.lower()
+    # One- or two-word questions ("germany?", "why not?") lean on the previous turn too
+    return bool(_FOLLOW_UP_OPENER.match(q) or _FOLLOW_UP_PATTERN.search(q)) or len(q.split()) <= 2
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    # Same 4-characters-per-token estimate as estimate_tokens(); cut on a word boundary
+    limit = max(0, max_tokens) * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip() + " …"
+
+
+def pair_turns(messages) -> list[tuple[str, str]]:
+    """
+    LangChain chat messages → [(question, answer), ...] in order.
+    A trailing question without an answer is dropped.
+    """
+    turns, question = [], None
+    for message in messages:
+        if message.type == "human":
+            question = str(message.content)
+        elif message.type == "ai" and question is not None:
+            turns.append((question, str(message.content)))
+            question = None
+    return turns
+
+
+def _render_turn(question: str, answer: str) -> str:
+    return f"User: {question}\nAssistant: {answer}"
+
+
+def render_history(summary: str, turns: list[tuple[str, str]], budget: int = HISTORY_TOKEN_BUDGET) -> str:
+    """
+    Summary first, then as many of the most recent turns as fit in `budget` tokens.
+    The newest turn is always included (truncated if it alone is too long);
+    turns that don't fit are simply left out until they are summarized.
+    """
+    parts, used = [], 0
+    if summary:
+        block = "Conversation summary: " + truncate_tokens(summary, min(SUMMARY_MAX_TOKENS, budget // 2))
+        parts.append(block)
+        used += estimate_tokens(block)
+
+    recent = []
+    for question, answer in reversed(turns):
+        text = _render_turn(question, answer)
+        cost = estimate_tokens(text)
+        if used + cost > budget:
+            if not recent and budget - used > 16:
+                recent.append(truncate_tokens(text, budget - used))
+            break
+        recent.append(text)
+        used += cost
+    if recent:
+        parts.append("Recent conversation:\n" + "\n".join(reversed(recent)))
+    return "\n".join(parts)
+
+
+def extractive_summary(summary: str, turns: list[tuple[str, str]], max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """
+    LLM-free fallback: one short line per folded turn, oldest lines dropped
+    first once the summary is over `max_tokens`.
+    """
+    lines = [line for line in summary.splitlines() if line.strip()]
+    for question, answer in turns:
+        first_sentence = re.split(r"(?<=[.?!])\s", answer.strip(), maxsplit=1)[0]
+        lines.append(f"- Asked: {truncate_tokens(question, 20)} → {truncate_tokens(first_sentence, 30)}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return truncate_tokens("\n".join(lines), max_tokens)
+
+
+def summary_prompt(summary: str, turns: list[tuple[str, str]], max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    new_turns = "\n".join(_render_turn(q, truncate_tokens(a, 150)) for q, a in turns)
+    return (
+        f"{SUMMARY_PROMPT_PREFIX} with the new turns below. "
+        f"Keep names, numbers, topics and open questions the user may refer back to. "
+        f"Use at most {max_tokens * 3 // 4} words. Reply with the updated summary only.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{new_turns}"
+    )
@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from Backend.core.config import (
+    EVAL_SAMPLE_RATE,
+    EVAL_QUEUE_SIZE,
+    EVAL_BATCH_SIZE,
+    EVAL_BATCH_WAIT,
+    EVAL_WORKERS,
+    EVAL_SCORE_THRESHOLD,
+    EVAL_WINDOW,
+    EVAL_DIR,
+    EVAL_STORE_TEXT,
+    EVAL_MAX_FILE_BYTES,
+    EVAL_BACKUPS,
+)
+from Backend.core.logger import get_logger, log_event, request_id_var
+from Backend.core.metrics import STAGE_SECONDS, EVAL_RECORDS, EVAL_SCORES
+from knowledgeBase.Evaluators.embedding_service import embedding_service
+
+logger = get_logger("evaluation")
+
+_SCORES = ("hybrid_score", "semantic_score", "hallucination_score", "toxicity_score")
+_FLAGS = ("prompt", "low_hybrid_score", "hallucination", "toxic")
+
+
+def _summary(values) -> dict:
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype="float64")
+    return {
+        "mean": round(float(arr.mean()), 4),
+        "p10": round(float(np.percentile(arr, 10)), 4),
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "min": round(float(arr.min()), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+
+class EvaluationPipeline:
+    """
+    Scores a sample of served answers off the request path.
+
+    offer() never blocks: a record is kept with probability `sample_rate`
+    and dropped when the bounded queue is full. Worker threads drain the
+    queue in batches (waiting at most `batch_wait` seconds for one to fill),
+    run the evaluators in knowledgeBase/Evaluators, append one JSON line per
+    record to a size-rotated evaluations.jsonl and keep per-route aggregates
+    for /eval/stats (also written to summary.json after every batch).
+
+    Stored records hold scores, flags, route and request_id; the question and
+    answer text only with `store_text` (like the logs, which keep user text
+    at DEBUG).
+    """
+
+    def __init__(self, sample_rate: float = EVAL_SAMPLE_RATE, queue_size: int = EVAL_QUEUE_SIZE,
+                 batch_size: int = EVAL_BATCH_SIZE, batch_wait: float = EVAL_BATCH_WAIT,
+                 workers: int = EVAL_WORKERS, score_threshold: float = EVAL_SCORE_THRESHOLD,
+                 window: int = EVAL_WINDOW, directory: str = EVAL_DIR, store_text: bool = EVAL_STORE_TEXT,
+                 max_file_bytes: int = EVAL_MAX_FILE_BYTES, backups: int = EVAL_BACKUPS):
+        self.sample_rate = sample_rate
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.workers = max(1, workers)
+        self.score_threshold = score_threshold
+        self.window = window
+        self.directory = directory
+        self.store_text = store_text
+        self.max_file_bytes = max_file_bytes
+        self.backups = max(0, backups)
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()        # aggregates + worker start
+        self._write_lock = threading.Lock()  # evaluations.jsonl append / rotation
+        self._hybrid = None
+        self._failing = set()  # checks whose failure was already logged at WARNING
+        self._routes = {}      # route ("all" included) -> {"evaluated", "flagged": {...}, "scores": {name: deque}}
+        self.sampled = 0
+        self.dropped = 0
+        self.evaluated = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ---------------------------------------------------------------
+    # Request side
+
+    def offer(self, question: str, answer: str, route: str, context=None) -> bool:
+        """
+        Queues (question, context, answer) for evaluation if sampled. `context`
+        is the reference the answer should be grounded in, or a callable that
+        returns it; callables run on the worker, so retrieval stays off /ask.
+        """
+        if not self.enabled or not answer or random.random() >= self.sample_rate:
+            return False
+        record = {
+            "ts": round(time.time(), 3),
+            "request_id": request_id_var.get(),
+            "route": route,
+            "question": question,
+            "answer": answer,
+            "context": context,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            EVAL_RECORDS.inc(result="dropped")
+            return False
+        with self._lock:
+            self.sampled += 1
+        EVAL_RECORDS.inc(result="sampled")
+        self._ensure_workers()
+        return True
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads or self._stopping.is_set():
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"eval-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # ---------------------------------------------------------------
+    # Worker side
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                # Context retrieval and scoring encode on this thread, not through the serving batcher
+                with embedding_service.unbatched():
+                    results = self.evaluate_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    self.failed += len(batch)
+                EVAL_RECORDS.inc(len(batch), result="failed")
+                log_event(logger, logging.ERROR, "eval_batch_error", records=len(batch), error=str(e))
+                continue
+            self._record(results)
+            self._persist(results)
+
+    def _hybrid_evaluator(self):
+        # Evaluators pull in NLTK / rouge → imported by the first worker batch, never by the API
+        if self._hybrid is None:
+            from knowledgeBase.Evaluators.Hybrid_evaluation import HybridEvaluator
+            from knowledgeBase.Evaluators.prompt_evaluator import PromptEvaluator
+
+            self._hybrid = HybridEvaluator(PromptEvaluator())
+        return self._hybrid
+
+    def _check(self, name: str, results: list, fn):
+        # One check failing (model missing, NLTK data absent) must not lose the others
+        try:
+            fn()
+        except Exception as e:
+            for result in results:
+                result["errors"][name] = str(e)
+            level = logging.DEBUG if name in self._failing else logging.WARNING
+            self._failing.add(name)
+            log_event(logger, level, "eval_check_failed", check=name, error=str(e))
+
+    @staticmethod
+    def _resolve(record: dict) -> str:
+        context = record["context"]
+        if callable(context):
+            context = context()
+        return (context or "").strip()
+
+    def evaluate_batch(self, records: list) -> list:
+        """
+        One result dict per record: prompt checks for every answer, hybrid and
+        hallucination scores where a reference context exists, toxicity for all.
+        """
+        started = time.perf_counter()
+        results, references = [], []
+        for record in records:
+            result = {k: record[k] for k in ("ts", "request_id", "route", "question", "answer")}
+            result.update(scores={}, flags=[], errors={})
+            try:
+                reference = self._resolve(record)
+            except Exception as e:
+                reference = ""
+                result["errors"]["context"] = str(e)
+            result["context_chars"] = len(reference)
+            results.append(result)
+            references.append(reference)
+        grounded = [i for i, ref in enumerate(references) if ref]
+        ungrounded = [i for i, ref in enumerate(references) if not ref]
+
+        def hybrid():
+            evaluator = self._hybrid_evaluator()
+            rows = [{"prompt": records[i]["question"], "response": records[i]["answer"], "reference": references[i]}
+                    for i in grounded]
+            for i, scored in zip(grounded, evaluator.score_batch(rows, self.score_threshold)):
+                results[i]["prompt_eval"] = scored["prompt_eval"]
+                for name in ("semantic_score", "bleu_score", "rouge_score", "f1_score", "hybrid_score"):
+                    results[i]["scores"][name] = round(float(scored[name]), 4)
+            for i in ungrounded:
+                results[i]["prompt_eval"] = evaluator.prompt_evaluator.evaluate_prompt(
+                    records[i]["answer"], records[i]["question"], log=False)
+
+        def hallucination():
+            from knowledgeBase.Evaluators.hallucination_check import hallucination_score
+
+            # Answers + references in one encode; the per-pair scores below hit the embedding LRU
+            if grounded:
+                embedding_service.encode([records[i]["answer"] for i in grounded] + [references[i] for i in grounded])
+            for i in grounded:
+                results[i]["scores"]["hallucination_score"] = hallucination_score(records[i]["answer"], references[i])
+
+        def toxicity():
+            from knowledgeBase.Evaluators.toxicity_filter import check_toxicity_batch
+
+            for result, (flagged, score) in zip(results, check_toxicity_batch([r["answer"] for r in records])):
+                result["scores"]["toxicity_score"] = score
+                if flagged:
+                    result["flags"].append("toxic")
+
+        self._check("hybrid", results, hybrid)
+        self._check("hallucination", results, hallucination)
+        self._check("toxicity", results, toxicity)
+
+        for result in results:
+            scores = result["scores"]
+            if result.get("prompt_eval", {}).get("flagged"):
+                result["flags"].append("prompt")
+            if scores.get("hybrid_score", 1.0) < self.score_threshold:
+                result["flags"].append("low_hybrid_score")
+            if scores.get("hallucination_score", 1.0) < self.score_threshold:
+                result["flags"].append("hallucination")
+            for name in ("hybrid", "hallucination", "toxicity"):
+                if f"{name}_score" in scores:
+                    EVAL_SCORES.observe(scores[f"{name}_score"], route=result["route"], score=name)
+            if result["flags"]:
+                log_event(logger, logging.INFO, "eval_flagged", route=result["route"], flags=result["flags"],
+                          eval_request_id=result["request_id"], **scores)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="eval_batch")
+        return results
+
+    # ---------------------------------------------------------------
+    # Aggregates + store
+
+    def _route_state(self, route: str) -> dict:
+        state = self._routes.get(route)
+        if state is None:
+            state = self._routes[route] = {
+                "evaluated": 0,
+                "flagged": 0,
+                "flags": dict.fromkeys(_FLAGS, 0),
+                "scores": {name: deque(maxlen=self.window) for name in _SCORES},
+            }
+        return state
+
+    def _record(self, results: list):
+        with self._lock:
+            self.evaluated += len(results)
+            for result in results:
+                for state in (self._route_state("all"), self._route_state(result["route"])):
+                    state["evaluated"] += 1
+                    state["flagged"] += bool(result["flags"])
+                    for flag in result["flags"]:
+                        state["flags"][flag] += 1
+                    for name in _SCORES:
+                        if name in result["scores"]:
+                            state["scores"][name].append(result["scores"][name])
+        EVAL_RECORDS.inc(len(results), result="evaluated")
+
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "evaluations.jsonl")
+
+    def _rotate(self, path: str):
+        # evaluations.jsonl → .1 → .2 ... ; the oldest beyond `backups` is overwritten
+        if self.backups == 0:
+            os.remove(path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+    def _persist(self, results: list):
+        if not self.directory:
+            return
+        if not self.store_text:
+            results = [{k: v for k, v in r.items() if k not in ("question", "answer")} for r in results]
+        data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in results).encode("utf-8")
+        path = self._log_path()
+        try:
+            with self._write_lock:
+                os.makedirs(self.directory, exist_ok=True)
+                if os.path.exists(path) and os.path.getsize(path) + len(data) > self.max_file_bytes:
+                    self._rotate(path)
+                with open(path, "ab") as f:
+                    f.write(data)
+                summary = os.path.join(self.directory, "summary.json")
+                with open(summary + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(self.stats(), f, indent=2)
+                os.replace(summary + ".tmp", summary)
+        except OSError as e:
+            log_event(logger, logging.ERROR, "eval_store_error", directory=self.directory, error=str(e))
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                route: {
+                    "evaluated": state["evaluated"],
+                    "flagged": state["flagged"],
+                    "flagged_rate": round(state["flagged"] / state["evaluated"], 4) if state["evaluated"] else 0.0,
+                    "flags": dict(state["flags"]),
+                    "scores": {name: _summary(values) for name, values in state["scores"].items() if values},
+                }
+                for route, state in self._routes.items()
+            }
+            return {
+                "enabled": self.enabled,
+                "sample_rate": self.sample_rate,
+                "sampled": self.sampled,
+                "dropped": self.dropped,
+                "evaluated": self.evaluated,
+                "failed": self.failed,
+                "pending": self.pending,
+                "store": self._log_path() if self.directory else None,
+                "routes": routes,
+            }
+
+    def shutdown(self, timeout: float = 5.0):
+        # Drains what is already queued (bounded by `timeout`), then stops the workers
+        self._stopping.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
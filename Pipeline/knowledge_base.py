@@ -0,0 +1,450 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from Backend.core.config import (
+    EMBEDDING_MODEL_NAME,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    KB_DIR,
+    KB_INDEX_DIR,
+    KB_EXTENSIONS,
+    KB_TOP_K,
+    KB_MIN_SIMILARITY,
+    KB_TOKEN_BUDGET,
+    KB_REFRESH_SECONDS,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import STAGE_SECONDS
+from knowledgeBase.Evaluators.embedding_service import embedding_service
+from Pipeline.content_cache import file_sha256
+from Pipeline.retriever import chunk_text, estimate_tokens
+
+logger = get_logger("knowledge_base")
+
+_MANIFEST_VERSION = 1
+_RRF_K = 60  # standard reciprocal-rank-fusion constant; damps the weight of top ranks
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its of on or so that the this to was "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def chunk_document(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Packs blank-line separated paragraphs (e.g. one Q/A pair of the notes)
+    into chunks of up to `chunk_size` characters; only paragraphs longer
+    than that are cut with chunk_text().
+    """
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > chunk_size:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(chunk_text(paragraph, chunk_size, overlap))
+        elif current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """
+    Inverted index (term → {chunk id: term frequency}) with Okapi BM25 scoring.
+    Chunks can be added and removed one at a time, so re-indexing a changed
+    file only touches the postings of that file's chunks.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, chunk_id: int, tokens: list[str]):
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        self.lengths[chunk_id] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, chunk_id: int, tokens: list[str]):
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(chunk_id, None)
+                if not posting:
+                    del self.postings[term]
+        self._total_length -= self.lengths.pop(chunk_id, 0)
+
+    def search(self, query_tokens: list[str], top_k: int) -> list[tuple[int, float]]:
+        if not self.lengths:
+            return []
+        n = len(self.lengths)
+        avg_length = self._total_length / n or 1.0
+        scores = {}
+        for term in set(query_tokens):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for chunk_id, tf in posting.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+class KnowledgeBase:
+    """
+    Hybrid index over the text files under KB_DIR: BM25 for exact terms,
+    embeddings for paraphrases, merged with reciprocal rank fusion.
+
+    Files are re-read only when their mtime or size changes, and re-embedded
+    only when their sha256 changes. Chunks and vectors are persisted under
+    KB_INDEX_DIR (manifest.json + one vectors/<sha256>.npy per file), so a
+    restart with unchanged files loads the index without calling the model.
+    """
+
+    def __init__(self, directory: str = KB_DIR, index_dir: str = KB_INDEX_DIR, top_k: int = KB_TOP_K,
+                 min_similarity: float = KB_MIN_SIMILARITY, token_budget: int = KB_TOKEN_BUDGET,
+                 refresh_seconds: float = KB_REFRESH_SECONDS, extensions=KB_EXTENSIONS):
+        self.directory = directory
+        self.index_dir = index_dir
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.token_budget = token_budget
+        self.refresh_seconds = refresh_seconds
+        self.extensions = tuple(extensions)
+        self.files = {}          # relative path -> {"mtime", "size", "sha256", "chunk_ids"}
+        self.chunks = {}         # chunk id -> (relative path, text, tokens)
+        self._vectors = {}       # chunk id -> embedding
+        self._bm25 = BM25Index()
+        self._dense_ids = []
+        self._dense_rows = {}    # chunk id -> row of self._dense
+        self._dense = None       # stacked vectors, rebuilt lazily after a change
+        self._next_id = 0
+        self._lock = threading.Lock()          # guards the index structures
+        self._refresh_lock = threading.Lock()  # one scan / re-embed at a time
+        self._loaded = False
+        self._last_scan = 0.0
+        self.version = ""
+        self.refreshes = 0
+        self.reindexed_files = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and os.path.isdir(self.directory)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self):
+        return len(self.chunks)
+
+    # ---------------------------------------------------------------
+    # Index maintenance
+    def _scan(self) -> dict:
+        found = {}
+        for root, dirs, names in os.walk(self.directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith((".", "__")))
+            for name in names:
+                if name.startswith(".") or not name.lower().endswith(self.extensions):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[os.path.relpath(path, self.directory)] = (stat.st_mtime, stat.st_size)
+        return found
+
+    def _add_file(self, rel: str, record: dict, chunks: list[str], vectors):
+        ids = []
+        for text, vector in zip(chunks, vectors):
+            chunk_id = self._next_id
+            self._next_id += 1
+            tokens = tokenize(text)
+            self.chunks[chunk_id] = (rel, text, tokens)
+            self._vectors[chunk_id] = np.asarray(vector, dtype="float32")
+            self._bm25.add(chunk_id, tokens)
+            ids.append(chunk_id)
+        self.files[rel] = {**record, "chunk_ids": ids}
+
+    def _remove_file(self, rel: str):
+        record = self.files.pop(rel, None)
+        for chunk_id in (record or {}).get("chunk_ids", []):
+            _, _, tokens = self.chunks.pop(chunk_id)
+            self._vectors.pop(chunk_id, None)
+            self._bm25.remove(chunk_id, tokens)
+
+    def _changed(self):
+        self._dense = None
+        digest = hashlib.sha256()
+        for rel in sorted(self.files):
+            digest.update(f"{rel}\0{self.files[rel]['sha256']}\0".encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+    def load(self):
+        """
+        Loads the persisted index (if it matches the current model and
+        chunking), then indexes whatever changed on disk since it was saved.
+        """
+        if self._loaded:
+            return
+        with self._refresh_lock:
+            if self._loaded:
+                return
+            if self.enabled:
+                self._load_from_disk()
+            self._loaded = True
+        self.refresh(force=True)
+
+    def _settings(self) -> dict:
+        return {"version": _MANIFEST_VERSION, "model": EMBEDDING_MODEL_NAME,
+                "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+    def _load_from_disk(self):
+        if not self.index_dir:
+            return
+        try:
+            with open(os.path.join(self.index_dir, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if manifest.get("settings") != self._settings():
+            log_event(logger, logging.INFO, "kb_index_outdated", index_dir=self.index_dir)
+            return
+        with self._lock:
+            for rel, entry in manifest.get("files", {}).items():
+                try:
+                    vectors = np.load(self._vector_path(entry["sha256"]))
+                except (FileNotFoundError, ValueError):
+                    continue  # re-embedded by the refresh that follows
+                if len(vectors) != len(entry["chunks"]):
+                    continue
+                record = {k: entry[k] for k in ("mtime", "size", "sha256")}
+                self._add_file(rel, record, entry["chunks"], vectors)
+            self._changed()
+        log_event(logger, logging.INFO, "kb_index_loaded", files=len(self.files), chunks=len(self.chunks))
+
+    def _vector_path(self, sha256: str) -> str:
+        return os.path.join(self.index_dir, "vectors", f"{sha256}.npy")
+
+    def _save(self):
+        if not self.index_dir:
+            return
+        os.makedirs(os.path.join(self.index_dir, "vectors"), exist_ok=True)
+        with self._lock:
+            files = {}
+            for rel, record in self.files.items():
+                ids = record["chunk_ids"]
+                files[rel] = {
+                    "mtime": record["mtime"], "size": record["size"], "sha256": record["sha256"],
+                    "chunks": [self.chunks[i][1] for i in ids],
+                }
+                path = self._vector_path(record["sha256"])
+                if ids and not os.path.exists(path):
+                    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    with open(tmp, "wb") as f:
+                        np.save(f, np.stack([self._vectors[i] for i in ids]))
+                    os.replace(tmp, path)
+            live = {f"{record['sha256']}.npy" for record in self.files.values()}
+        manifest = {"settings": self._settings(), "files": files}
+        tmp = os.path.join(self.index_dir, f"manifest.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.index_dir, "manifest.json"))
+        # Vectors of files that were edited or deleted
+        for name in os.listdir(os.path.join(self.index_dir, "vectors")):
+            if name.endswith(".npy") and name not in live:
+                try:
+                    os.remove(os.path.join(self.index_dir, "vectors", name))
+                except OSError:
+                    pass
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Re-indexes files whose mtime/size and sha256 changed, drops deleted
+        files. Without `force` it runs at most every `refresh_seconds` and
+        never waits for a refresh already in progress. Returns files re-indexed.
+        """
+        if not self.enabled:
+            return 0
+        if not force and time.monotonic() - self._last_scan < self.refresh_seconds:
+            return 0
+        if not self._refresh_lock.acquire(blocking=force):
+            return 0
+        try:
+            self._last_scan = time.monotonic()
+            return self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self) -> int:
+        found = self._scan()
+        removed = [rel for rel in self.files if rel not in found]
+        touched, changed = [], []
+        for rel, (mtime, size) in found.items():
+            record = self.files.get(rel)
+            if record and record["mtime"] == mtime and record["size"] == size:
+                continue
+            path = os.path.join(self.directory, rel)
+            try:
+                sha256 = file_sha256(path)
+            except OSError:
+                continue
+            if record and record["sha256"] == sha256:
+                touched.append((rel, mtime, size))  # saved again without edits → nothing to re-embed
+            else:
+                changed.append((rel, {"mtime": mtime, "size": size, "sha256": sha256}))
+        if not (removed or touched or changed):
+            return 0
+
+        started = time.perf_counter()
+        indexed = []
+        for rel, record in changed:
+            try:
+                with open(os.path.join(self.directory, rel), encoding="utf-8", errors="replace") as f:
+                    chunks = chunk_document(f.read())
+                vectors = embedding_service.encode(chunks) if chunks else []
+            except Exception as e:
+                # Left out of the manifest → retried on the next refresh
+                log_event(logger, logging.ERROR, "kb_index_failed", file=rel, error=str(e))
+                continue
+            indexed.append((rel, record, chunks, vectors))
+
+        with self._lock:
+            for rel in removed:
+                self._remove_file(rel)
+            for rel, mtime, size in touched:
+                self.files[rel].update(mtime=mtime, size=size)
+            for rel, record, chunks, vectors in indexed:
+                self._remove_file(rel)
+                self._add_file(rel, record, chunks, vectors)
+            self._changed()
+        try:
+            self._save()
+        except OSError as e:
+            log_event(logger, logging.WARNING, "kb_index_save_failed", index_dir=self.index_dir, error=str(e))
+
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage="kb_index")
+        self.refreshes += 1
+        self.reindexed_files += len(indexed)
+        log_event(logger, logging.INFO, "kb_reindexed", reindexed=len(indexed), removed=len(removed),
+                  files=len(self.files), chunks=len(self.chunks), version=self.version,
+                  ms=round(seconds * 1000, 2))
+        return len(indexed)
+
+    # ---------------------------------------------------------------
+    # Queries
+    def _dense_matrix(self):
+        # Caller holds self._lock
+        if self._dense is None and self._vectors:
+            self._dense_ids = list(self._vectors)
+            self._dense_rows = {chunk_id: row for row, chunk_id in enumerate(self._dense_ids)}
+            self._dense = np.stack([self._vectors[i] for i in self._dense_ids])
+        return self._dense
+
+    def search(self, question: str, top_k: int = None) -> list[dict]:
+        """
+        Fused ranking of the best chunks: [{"file", "text", "score", "similarity", "bm25"}, ...].
+        `similarity` is the chunk's cosine to the question (what the
+        answer-locally threshold looks at), `score` the RRF score used for order.
+        """
+        if not self.enabled:
+            return []
+        self.load()
+        self.refresh()
+        top_k = top_k or self.top_k
+        with STAGE_SECONDS.time(stage="kb_search"):
+            if not self.chunks:
+                return []
+            query = embedding_service.encode(question)
+            depth = max(top_k * 4, 20)
+            with self._lock:
+                lexical = self._bm25.search(tokenize(question), depth)
+                matrix = self._dense_matrix()
+                scores, dense = None, []
+                if matrix is not None:
+                    scores = matrix @ query
+                    order = np.argsort(-scores)[:depth]
+                    dense = [(self._dense_ids[i], float(scores[i])) for i in order]
+
+                fused = {}
+                for ranking in (lexical, dense):
+                    for rank, (chunk_id, _) in enumerate(ranking):
+                        fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (_RRF_K + rank + 1)
+                bm25 = dict(lexical)
+                hits = []
+                for chunk_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]:
+                    rel, text, _ = self.chunks[chunk_id]
+                    row = self._dense_rows.get(chunk_id)
+                    similarity = float(scores[row]) if scores is not None and row is not None else 0.0
+                    hits.append({"file": rel, "text": text, "score": round(score, 6),
+                                 "similarity": round(similarity, 4),
+                                 "bm25": round(bm25.get(chunk_id, 0.0), 4)})
+        return hits
+
+    def answers(self, question: str) -> bool:
+        """
+        True when some chunk is close enough to the question to answer from the
+        knowledge base instead of the web. Index / model errors → False.
+        """
+        try:
+            hits = self.search(question)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "kb_search_error", error=str(e))
+            return False
+        return any(hit["similarity"] >= self.min_similarity for hit in hits)
+
+    def build_context(self, question: str, token_budget: int = None) -> str:
+        budget = token_budget or self.token_budget
+        selected, used = [], 0
+        for hit in self.search(question):
+            cost = estimate_tokens(hit["text"])
+            if used + cost > budget:
+                continue
+            selected.append(hit["text"])
+            used += cost
+        return "\n...\n".join(selected)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "index_dir": self.index_dir,
+                "loaded": self._loaded,
+                "files": len(self.files),
+                "chunks": len(self.chunks),
+                "terms": len(self._bm25.postings),
+                "version": self.version,
+                "refreshes": self.refreshes,
+                "reindexed_files": self.reindexed_files,
+            }
@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from Backend.core.config import (
+    PDF_WORKERS,
+    PDF_PAGES_PER_TASK,
+    OCR_RESOLUTION,
+    MAX_PDF_PAGES,
+    MAX_CONCURRENT_INGESTIONS,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import STAGE_SECONDS
+from Pipeline.content_cache import content_cache, file_sha256, ocr_cache_path
+
+logger = get_logger("pdf_extractor")
+
+
+def extract_page_batch(path: str, page_numbers: list[int], resolution: int = OCR_RESOLUTION, ocr_dir: str = None) -> list[tuple]:
+    """
+    Runs inside a worker process. Opens the PDF once and extracts the given pages,
+    falling back to Tesseract only for pages without an embedded text layer.
+    With `ocr_dir`, rendered pages are hashed and previously OCR'd pages are read from disk.
+
+    Returns:
+        list of (page_number, text, used_ocr, page_hash, ocr_cache_hit, ocr_seconds)
+    """
+    import pdfplumber
+    import pytesseract
+
+    results = []
+    with pdfplumber.open(path) as pdf:
+        for number in page_numbers:
+            page = pdf.pages[number]
+            text = page.extract_text()
+            if text and text.strip():
+                results.append((number, text, False, None, False, 0.0))
+            else:
+                image = page.to_image(resolution=resolution).original
+                page_hash = hashlib.sha256(image.tobytes()).hexdigest()
+                cached = ocr_cache_path(ocr_dir, page_hash) if ocr_dir else None
+                if cached and os.path.exists(cached):
+                    with open(cached, encoding="utf-8") as f:
+                        results.append((number, f.read(), True, page_hash, True, 0.0))
+                else:
+                    started = time.perf_counter()
+                    text_ocr = pytesseract.image_to_string(image)
+                    ocr_seconds = time.perf_counter() - started
+                    results.append((number, text_ocr if text_ocr.strip() else "", True, page_hash, False, ocr_seconds))
+            page.flush_cache()  # keep worker memory at ~one page
+    return results
+
+
+def _warm_worker(_):
+    # Pays the pdfplumber / pytesseract import cost in each worker before the first upload
+    import pdfplumber
+    import pytesseract
+    return os.getpid()
+
+
+def count_pages(path: str) -> int:
+    import pdfplumber
+
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+class PageLimitExceeded(ValueError):
+    pass
+
+
+class PDFExtractor:
+    """
+    Spreads PDF pages across a process pool so text extraction and OCR
+    never run on the event loop, then stitches the pages back in order.
+    """
+
+    def __init__(self, workers: int = PDF_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK, max_pages: int = MAX_PDF_PAGES):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.max_pages = max_pages
+        self._pool = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    @property
+    def ready(self) -> bool:
+        return self._pool is not None
+
+    def warm(self):
+        list(self.pool.map(_warm_worker, range(self.workers)))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        # A dead worker (e.g. OOM-killed mid-OCR) breaks the whole pool for good → the next use builds a new one
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _batches(self, total_pages: int) -> list[list[int]]:
+        pages = list(range(total_pages))
+        return [pages[i:i + self.pages_per_task] for i in range(0, total_pages, self.pages_per_task)]
+
+    async def aextract(self, path: str, on_progress=None, file_hash: str = None) -> str:
+        """
+        Extracts all pages of the PDF at `path` concurrently.
+        `on_progress(pages_done, pages_total)` is called as batches finish.
+        Pass `file_hash` if the caller already hashed the file while receiving it.
+        """
+        loop = asyncio.get_running_loop()
+
+        # Same bytes as an earlier upload → reuse its text, skip pdfplumber/Tesseract entirely
+        file_hash = file_hash or await loop.run_in_executor(None, file_sha256, path)
+        cached = await loop.run_in_executor(None, content_cache.get_text, file_hash)
+        if cached is not None:
+            log_event(logger, logging.INFO, "content_cache_hit", file_hash=file_hash[:12], chars=len(cached))
+            return cached
+
+        started = time.perf_counter()
+
+        total = await loop.run_in_executor(None, count_pages, path)
+        if total > self.max_pages:
+            raise PageLimitExceeded(f"PDF has {total} pages, limit is {self.max_pages}")
+        try:
+            parts = await self._extract_pages(path, total, on_progress)
+        except BrokenProcessPool as e:
+            # One retry on a fresh pool; a PDF that kills a worker again fails only this upload
+            log_event(logger, logging.WARNING, "pdf_pool_broken", file_hash=file_hash[:12], error=str(e))
+            parts = await self._extract_pages(path, total, on_progress)
+        extracted = "\n".join(parts).rstrip("\n")
+
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage="pdf_extraction")
+        log_event(logger, logging.INFO, "pdf_extracted", file_hash=file_hash[:12], pages=total,
+                  chars=len(extracted), ms=round(seconds * 1000, 2))
+        if extracted.strip():
+            await loop.run_in_executor(None, content_cache.put_text, file_hash, extracted)
+        return extracted
+
+    async def _extract_pages(self, path: str, total: int, on_progress=None) -> list[str]:
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        if on_progress:
+            on_progress(0, total)
+
+        # About one batch per worker is in flight; a new one is submitted as each finishes.
+        # Pages are appended in order as soon as every earlier page is done, so only
+        # out-of-order pages wait in `pending` (bounded by the batches in flight).
+        batches = iter(self._batches(total))
+        in_flight = set()
+        parts, pending, next_page, done = [], {}, 0, 0
+
+        def submit_next():
+            batch = next(batches, None)
+            if batch is not None:
+                in_flight.add(loop.run_in_executor(pool, extract_page_batch, path, batch,
+                                                   OCR_RESOLUTION, content_cache.ocr_dir))
+
+        try:
+            for _ in range(self.workers):
+                submit_next()
+            while in_flight:
+                finished, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in finished:
+                    in_flight.discard(future)
+                    submit_next()
+                    for number, text, used_ocr, page_hash, ocr_hit, ocr_seconds in future.result():
+                        pending[number] = text
+                        done += 1
+                        if ocr_hit:
+                            content_cache.touch_ocr(page_hash)
+                        elif used_ocr:
+                            # Timed inside the worker, observed here: metrics live in this process
+                            STAGE_SECONDS.observe(ocr_seconds, stage="ocr_page")
+                            content_cache.put_ocr(page_hash, text)
+                while next_page in pending:
+                    text = pending.pop(next_page)
+                    if text.strip():
+                        parts.append(text)
+                    next_page += 1
+                if on_progress:
+                    on_progress(done, total)
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise
+        finally:
+            for future in in_flight:
+                future.cancel()
+        return parts
+
+
+class IngestionLimiter:
+    """
+    Caps how many uploads are being ingested at once. Callers that find it full
+    are rejected straight away (→ 429) instead of queueing behind big PDFs.
+    """
+
+    def __init__(self, limit: int = MAX_CONCURRENT_INGESTIONS):
+        self.limit = limit
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        # Only touched from the event loop thread → no lock needed
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active = max(0, self.active - 1)
+
+
+class ExtractionJobs:
+    """
+    Tracks background extraction jobs so large uploads can return immediately
+    and be polled through the status endpoint.
+    """
+
+    def __init__(self, extractor: PDFExtractor, max_jobs: int = 1000):
+        self.extractor = extractor
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self._tasks = {}
+
+    def _prune(self):
+        # Forget the oldest finished jobs once the registry is full (dicts keep insertion order)
+        finished = [j for j, info in self.jobs.items() if j not in self._tasks]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs + 1)]:
+            del self.jobs[job_id]
+
+    def submit(self, path: str, on_done=None, on_finish=None, file_hash: str = None) -> str:
+        """
+        Starts extraction in the background and returns a job id.
+        `on_done(job_id, text)` runs in a worker thread once all pages are extracted.
+        `on_finish()` runs on the event loop when the job ends, whatever the outcome.
+        """
+        self._prune()
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {"status": "queued", "pages_done": 0, "pages_total": None, "error": None}
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, path, on_done, on_finish, file_hash))
+        return job_id
+
+    def status(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    async def _run(self, job_id: str, path: str, on_done, on_finish, file_hash):
+        job = self.jobs[job_id]
+
+        def progress(done, total):
+            job.update(status="running", pages_done=done, pages_total=total)
+
+        try:
+            text = await self.extractor.aextract(path, on_progress=progress, file_hash=file_hash)
+            if on_done:
+                await asyncio.get_running_loop().run_in_executor(None, on_done, job_id, text)
+            job["status"] = "done" if text.strip() else "empty"
+        except Exception as e:
+            job.update(status="failed", error=str(e))
+            log_event(logger, logging.ERROR, "extraction_job_failed", job_id=job_id, error=str(e))
+        finally:
+            self._tasks.pop(job_id, None)
+            if os.path.exists(path):
+                os.remove(path)
+            if on_finish:
+                on_finish()
+
+
+pdf_extractor = PDFExtractor()
+extraction_jobs = ExtractionJobs(pdf_extractor)
+ingestion_limiter = IngestionLimiter()
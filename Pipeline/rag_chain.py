@@ -1,64 +1,370 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
 import os
 import re
+import threading
+import time
+from functools import partial
 from dotenv import load_dotenv
 
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.memory import ConversationBufferMemory
-from langchain.schema.runnable import RunnableMap
-from langchain.tools import Tool
-from langchain_community.utilities import SerpAPIWrapper
+from Backend.core.config import (
+    LLM_TIMEOUT,
+    SEARCH_TIMEOUT,
+    SEARCH_CACHE_TTL,
+    PROMPT_TOKEN_BUDGET,
+    HISTORY_TOKEN_BUDGET,
+    SUMMARY_MAX_TOKENS,
+    WEB_EXECUTION_MODE,
+    WEB_HEDGE_DELAY,
+    WEB_DEADLINE,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import STAGE_SECONDS, ROUTE_DECISIONS, PROMPT_TOKENS, HEDGE_OUTCOMES
+from Backend.core.resilience import CircuitOpenError, UpstreamBusy
+from Pipeline.answer_cache import AnswerCache
+from Pipeline.evaluation_pipeline import EvaluationPipeline
+from Pipeline.knowledge_base import KnowledgeBase
+from Pipeline.conversation_memory import (
+    is_follow_up,
+    render_history,
+    extractive_summary,
+    summary_prompt,
+    truncate_tokens,
+)
+from Pipeline.retriever import estimate_tokens
+from Pipeline.search_cache import SearchCache
+from Pipeline.session_store import SessionStore, Session
+from Pipeline.upstreams import llm_upstream, search_upstream, build_chat_groq, PooledSerpAPI
 
 # ✅ Load .env variables
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
+logger = get_logger("rag_chain")
+
+# LangChain / Groq / SerpAPI clients are built on first use (or during warm-up),
+# so importing this module doesn't pull in the whole LangChain stack. Both talk
+# through the shared keep-alive pools and resilience guards in Pipeline.upstreams.
+_search_lock = threading.Lock()
+_search = None
+_search_tool = None
+_hedge_pool = None
+
 # ✅ Setup SerpAPI Wrapper
-search = SerpAPIWrapper(
-    serpapi_api_key=SERPAPI_API_KEY,
-    params={"num": 3, "hl": "en", "gl": "us", "timeout": 3}
-)
+def get_search():
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                from langchain_community.utilities import SerpAPIWrapper
+                _search = PooledSerpAPI(SerpAPIWrapper(
+                    serpapi_api_key=SERPAPI_API_KEY,
+                    params={"num": 3, "hl": "en", "gl": "us"}
+                ))
+    return _search
 
-search_tool = Tool.from_function(
-    func=search.run,
-    name="search",
-    description="Search the web for current or real-time information like latest news, stats, updates, etc."
-)
+def get_search_tool():
+    global _search_tool
+    if _search_tool is None:
+        search = get_search()
+        with _search_lock:
+            if _search_tool is None:
+                from langchain.tools import Tool
+                _search_tool = Tool.from_function(
+                    func=search.run,
+                    name="search",
+                    description="Search the web for current or real-time information like latest news, stats, updates, etc."
+                )
+    return _search_tool
+
+def search_ready() -> bool:
+    return _search is not None
+
+def get_hedge_pool() -> concurrent.futures.ThreadPoolExecutor:
+    # Threads for the sync hedged web route (run); the async path uses tasks
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _search_lock:
+            if _hedge_pool is None:
+                _hedge_pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="hedge")
+    return _hedge_pool
+
+def _acceptable(answer) -> bool:
+    # "⚠️ No meaningful answer found." / "⚠️ Sorry, ..." count as failures
+    return bool(answer) and not answer.startswith("⚠️")
 
 class RAGChainWithContext:
     def __init__(self):
-        self.pdf_context = ""
-        self.memory = ConversationBufferMemory(memory_key="history", return_messages=True)
-
-        # ✅ Chat Prompt Template
-        self.prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                "You're FlashQuery, a helpful AI assistant. Answer clearly and concisely. "
-                "If it's a math problem, solve step-by-step. If it's a writing question, keep it polite. "
-                "Use PDF context if provided. Use web data carefully. Provide structured steps if user asks how/why/guide."
-            ),
-            ("human", "{input}")
-        ])
+        # Per-user document, retrieval index and memory live in sessions, not on the chain
+        self.sessions = SessionStore()
+        self.answer_cache = AnswerCache()
+        self.search_cache = SearchCache()
+        self.knowledge_base = KnowledgeBase()
+        self.evaluations = EvaluationPipeline()
+        self.web_mode = WEB_EXECUTION_MODE
+        self.hedge_delay = WEB_HEDGE_DELAY
+        self.web_deadline = WEB_DEADLINE
+        self._chain = None
+        self._chain_lock = threading.Lock()
+        self._wrapped_chain = None
+        self._background = set()  # summary updates in flight (strong refs so they aren't GC'd)
+
+    @property
+    def chain(self):
+        if self._chain is None:
+            with self._chain_lock:
+                if self._chain is None:
+                    from langchain_core.prompts import ChatPromptTemplate
+
+                    # ✅ Chat Prompt Template
+                    self.prompt = ChatPromptTemplate.from_messages([
+                        (
+                            "system",
+                            "You're FlashQuery, a helpful AI assistant. Answer clearly and concisely. "
+                            "If it's a math problem, solve step-by-step. If it's a writing question, keep it polite. "
+                            "Use PDF context if provided. Use web data carefully. Provide structured steps if user asks how/why/guide."
+                        ),
+                        ("human", "{input}")
+                    ])
+
+                    # ✅ Load LLM with Groq
+                    self.llm = build_chat_groq(model="llama3-8b-8192", api_key=GROQ_API_KEY)
+                    self._chain = self.prompt | self.llm
+        return self._chain
+
+    @property
+    def chain_ready(self) -> bool:
+        return self._chain is not None
 
-        # ✅ Load LLM with Groq
-        self.llm = ChatGroq(model="llama3-8b-8192", api_key=GROQ_API_KEY)
-        self.chain = self.prompt | self.llm
+    @property
+    def wrapped_chain(self):
+        if self._wrapped_chain is None:
+            from langchain.schema.runnable import RunnableMap
+            self._wrapped_chain = RunnableMap({
+                "output": lambda x: self._invoke_chain(x["input"])
+            })
+        return self._wrapped_chain
 
-        self.wrapped_chain = RunnableMap({
-            "output": lambda x: self._invoke_chain(x["input"])
-        })
+    @staticmethod
+    def _log_prompt(mode: str, prompt: str):
+        # Size at INFO; the prompt itself (user text + PDF excerpts) only at DEBUG
+        log_event(logger, logging.INFO, "llm_prompt", mode=mode, prompt_chars=len(prompt))
+        log_event(logger, logging.DEBUG, "llm_prompt_text", mode=mode, prompt=prompt)
+
+    @staticmethod
+    def _upstream_failed(upstream: str, error: Exception, **fields):
+        # Counted per attempt by the upstream guard; this logs the outcome the caller sees
+        if isinstance(error, CircuitOpenError):
+            log_event(logger, logging.INFO, f"{upstream}_circuit_open", **fields)
+            return
+        kind = "busy" if isinstance(error, UpstreamBusy) else (
+            "timeout" if isinstance(error, asyncio.TimeoutError) else "error")
+        log_event(logger, logging.WARNING, f"{upstream}_{kind}", error=str(error), **fields)
 
     def _invoke_chain(self, prompt: str) -> str:
         try:
-            print("[📤 Prompt sent to LLM]:", prompt)
-            result = self.chain.invoke({"input": prompt})
+            self._log_prompt("invoke", prompt)
+            with STAGE_SECONDS.time(stage="llm_invoke"):
+                result = llm_upstream.call(self.chain.invoke, {"input": prompt}, timeout=LLM_TIMEOUT)
             return result.content.strip() if hasattr(result, "content") else str(result).strip()
         except Exception as e:
-            print(f"[❌ Error in _invoke_chain]: {str(e)}")
+            self._upstream_failed("llm", e)
             return "⚠️ Sorry, I couldn't generate a proper response right now."
 
+    async def _ainvoke_chain(self, prompt: str) -> str:
+        try:
+            self._log_prompt("ainvoke", prompt)
+            with STAGE_SECONDS.time(stage="llm_invoke"):
+                result = await llm_upstream.acall(self.chain.ainvoke, {"input": prompt}, timeout=LLM_TIMEOUT)
+            return result.content.strip() if hasattr(result, "content") else str(result).strip()
+        except Exception as e:
+            self._upstream_failed("llm", e, timeout_s=LLM_TIMEOUT)
+            return "⚠️ Sorry, I couldn't generate a proper response right now."
+
+    async def _open_stream(self, prompt: str):
+        stream = self.chain.astream({"input": prompt}).__aiter__()
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+        return first, stream
+
+    async def _astream_chain(self, prompt: str):
+        """
+        Yields completion text pieces as Groq produces them.
+        Opening the stream (up to the first piece) is retried by llm_upstream;
+        after that LLM_TIMEOUT bounds the wait for each piece rather than the whole answer.
+        """
+        emitted = False
+        started = time.perf_counter()
+        try:
+            self._log_prompt("astream", prompt)
+            async with llm_upstream.slot(LLM_TIMEOUT):
+                chunk, stream = await llm_upstream.acall(self._open_stream, prompt, timeout=LLM_TIMEOUT, slot=False)
+                while chunk is not None:
+                    text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                    if text:
+                        emitted = True
+                        yield text
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), timeout=LLM_TIMEOUT)
+                    except StopAsyncIteration:
+                        break
+                    except Exception as e:
+                        llm_upstream.record_failure(e)
+                        raise
+        except Exception as e:
+            self._upstream_failed("llm", e, timeout_s=LLM_TIMEOUT, streamed=emitted)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_stream")
+        if not emitted:
+            yield "⚠️ Sorry, I couldn't generate a proper response right now."
+
+    async def _asearch(self, question: str):
+        return await self.search_cache.aget(question, self._asearch_upstream)
+
+    async def _asearch_upstream(self, question: str):
+        # PooledSerpAPI.arun goes through the shared async httpx pool, so the event loop stays free while waiting
+        try:
+            with STAGE_SECONDS.time(stage="serpapi"):
+                return await search_upstream.acall(get_search().arun, question, timeout=SEARCH_TIMEOUT)
+        except Exception as e:
+            self._upstream_failed("serpapi", e, timeout_s=SEARCH_TIMEOUT)
+            raise
+
+    def _search_upstream(self, question: str):
+        try:
+            with STAGE_SECONDS.time(stage="serpapi"):
+                return search_upstream.call(get_search_tool().run, question, timeout=SEARCH_TIMEOUT)
+        except Exception as e:
+            self._upstream_failed("serpapi", e)
+            raise
+
+    def _web_answer(self, serp_result, question: str) -> str:
+        log_event(logger, logging.INFO, "web_search_result", result_chars=len(str(serp_result)))
+        log_event(logger, logging.DEBUG, "web_search_result_text", result=str(serp_result))
+        with STAGE_SECONDS.time(stage="clean_serp_output"):
+            return self.clean_serp_output(serp_result, question)
+
+    # ---------------------------------------------------------------
+    # Hedged web route: search and LLM race under one deadline
+    def _web_branch(self, question: str):
+        try:
+            serp_result = self.search_cache.get(question, self._search_upstream)
+        except Exception:
+            return None  # already counted and logged by _search_upstream
+        answer = self._web_answer(serp_result, question) if serp_result else None
+        return answer if _acceptable(answer) else None
+
+    def _llm_branch(self, question: str, route: str, session: Session):
+        answer = self._invoke_chain(self.build_prompt(question, route, session))
+        return answer if _acceptable(answer) else None
+
+    async def _aweb_branch(self, question: str):
+        try:
+            serp_result = await self._asearch(question)
+        except Exception:
+            return None  # timeouts / errors are counted and logged by _asearch_upstream
+        answer = self._web_answer(serp_result, question) if serp_result else None
+        return answer if _acceptable(answer) else None
+
+    async def _allm_branch(self, question: str, route: str, session: Session):
+        answer = await self._ainvoke_chain(self.build_prompt(question, route, session))
+        return answer if _acceptable(answer) else None
+
+    async def _astream_llm_branch(self, question: str, route: str, session: Session):
+        # Races on the first piece only; the winner keeps reading the same stream
+        stream = self._astream_chain(self.build_prompt(question, route, session))
+        first = await stream.__anext__()
+        if not _acceptable(first):
+            await stream.aclose()
+            return None
+        return first, stream
+
+    def _hedge_finished(self, winner, hedged: bool, started: float):
+        HEDGE_OUTCOMES.inc(winner=winner or "none", hedged="yes" if hedged else "no")
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="hedged_web")
+        if winner is None:
+            log_event(logger, logging.WARNING, "hedge_failed", hedged=hedged, deadline_s=self.web_deadline)
+
+    def _hedge(self, question: str, route: str, session: Session):
+        """
+        Sync twin of _ahedge(). Threads can't be interrupted, so a losing
+        branch runs to completion in the background and its result is dropped.
+        """
+        pool = get_hedge_pool()
+        started = time.perf_counter()
+        deadline, hedge_at = started + self.web_deadline, started + self.hedge_delay
+        # copy_context → the branch threads log with this request's id
+        futures = {pool.submit(contextvars.copy_context().run, self._web_branch, question): "web"}
+        winner, hedged = None, False
+        try:
+            while futures:
+                wake = deadline if hedged else min(deadline, hedge_at)
+                done, _ = concurrent.futures.wait(futures, timeout=max(0.0, wake - time.perf_counter()),
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    branch = futures.pop(future)
+                    result = future.result()
+                    if result is not None:
+                        winner = branch
+                        return branch, result
+                if time.perf_counter() >= deadline:
+                    break
+                if not hedged and (not futures or time.perf_counter() >= hedge_at):
+                    future = pool.submit(contextvars.copy_context().run, self._llm_branch, question, route, session)
+                    futures[future] = "llm"
+                    hedged = True
+            return None, None
+        finally:
+            for future in futures:
+                future.cancel()
+            self._hedge_finished(winner, hedged, started)
+
+    async def _ahedge(self, question: str, route: str, session: Session, llm_branch):
+        """
+        Search starts at once; `llm_branch()` joins after hedge_delay seconds,
+        or as soon as search fails or finds nothing meaningful. The first
+        acceptable result wins and the other branch is cancelled; at
+        web_deadline both are. Returns (winner, result), winner "web" / "llm" / None.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        deadline, hedge_at = loop.time() + self.web_deadline, loop.time() + self.hedge_delay
+        tasks = {asyncio.create_task(self._aweb_branch(question)): "web"}
+        winner, hedged = None, False
+        try:
+            while tasks:
+                wake = deadline if hedged else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(tasks, timeout=max(0.0, wake - loop.time()),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    branch = tasks.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        winner = branch
+                        return branch, result
+                if loop.time() >= deadline:
+                    break
+                if not hedged and (not tasks or loop.time() >= hedge_at):
+                    tasks[asyncio.create_task(llm_branch())] = "llm"
+                    hedged = True
+            return None, None
+        finally:
+            # The search itself is shielded by the search cache, so a cancelled
+            # web branch still finishes its SerpAPI call and caches the result
+            for task in tasks:
+                task.cancel()
+            self._hedge_finished(winner, hedged, started)
+
+    def _hedge_decided(self, winner, route: str):
+        if winner == "web":
+            self._decided("web", mode="hedged")
+        else:
+            self._decided("fallback", requested=route, mode="hedged", answered=winner is not None)
+
     def is_pdf_related(self, question: str) -> bool:
         q = question.lower()
         return any(k in q for k in [
@@ -109,37 +415,393 @@ class RAGChainWithContext:
 
         return filtered[0].strip() + " ✅" if filtered else "⚠️ No meaningful answer found."
 
-    def run(self, question: str, context: str = None) -> str:
-        if context:
-            self.pdf_context = context.strip()
+    def history_for(self, question: str, session: Session) -> str:
+        # Summary + newest turns, capped so history never crowds out the question itself
+        budget = min(HISTORY_TOKEN_BUDGET, PROMPT_TOKEN_BUDGET - estimate_tokens(question))
+        return render_history(session.summary, session.turns(), budget)
 
-        print("[🧠 Incoming Question]:", question)
+    def build_pdf_prompt(self, question: str, session: Session, history: str = "") -> str:
+        # PDF chunks get whatever the history and question leave of the prompt budget
+        budget = min(session.retriever.token_budget,
+                     PROMPT_TOKEN_BUDGET - estimate_tokens(history) - estimate_tokens(question))
+        budget = max(1, budget)
+        context = ""
+        started = time.perf_counter()
+        try:
+            context = session.retriever.build_context(question, budget)
+        except Exception as e:
+            log_event(logger, logging.ERROR, "retrieval_error", session_id=session.session_id, error=str(e))
+        if not context:
+            # Index unavailable → fall back to the head of the document within the same budget
+            context = session.pdf_context[:budget * 4]
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="retrieval")
+        log_event(logger, logging.INFO, "context_retrieved", session_id=session.session_id,
+                  context_tokens=estimate_tokens(context))
+        prompt = f"{context}\n\nQuestion: {question}"
+        return f"{history}\n\n{prompt}" if history else prompt
+
+    def build_kb_prompt(self, question: str, history: str = "") -> str:
+        budget = min(self.knowledge_base.token_budget,
+                     PROMPT_TOKEN_BUDGET - estimate_tokens(history) - estimate_tokens(question))
+        context = ""
+        try:
+            context = self.knowledge_base.build_context(question, max(1, budget))
+        except Exception as e:
+            log_event(logger, logging.ERROR, "kb_retrieval_error", error=str(e))
+        log_event(logger, logging.INFO, "kb_context_retrieved", context_tokens=estimate_tokens(context),
+                  kb_version=self.knowledge_base.version)
+        prompt = f"{context}\n\nQuestion: {question}" if context else question
+        return f"{history}\n\n{prompt}" if history else prompt
 
-        if self.pdf_context and self.is_pdf_related(question):
-            print("[📄 Using PDF Context]")
-            prompt = f"{self.pdf_context[:1500]}\n\nQuestion: {question}"
-            return self._invoke_chain(prompt)
+    def build_prompt(self, question: str, route: str, session: Session) -> str:
+        """
+        Final LLM input: conversation history (if any), PDF or knowledge-base
+        chunks for those routes, then the question — together within PROMPT_TOKEN_BUDGET.
+        """
+        history = self.history_for(question, session)
+        if route == "pdf":
+            prompt = self.build_pdf_prompt(question, session, history)
+        elif route == "kb":
+            prompt = self.build_kb_prompt(question, history)
+        elif history:
+            prompt = f"{history}\n\nQuestion: {question}"
+        else:
+            prompt = question
+        PROMPT_TOKENS.observe(estimate_tokens(prompt), route=route)
+        return prompt
 
-        if self.is_grammar_or_intro_query(question):
-            print("[✍️ Detected Grammar/Intro Query → LLM Preferred]")
-            return self._invoke_chain(question)
+    def depends_on_history(self, question: str, session: Session) -> bool:
+        # Follow-ups ("and germany?", "why?") only make sense with this session's turns → routed
+        # to the LLM and kept out of the shared answer cache; standalone questions stay cacheable
+        return bool(session.summary or session.turns()) and is_follow_up(question)
+
+    def route(self, question: str, session: Session = None) -> str:
+        """
+        Picks the answering strategy: "pdf", "grammar", "kb", "web" or "llm".
+        The local knowledge base is tried before web search; it embeds the
+        question, so async callers run this in a worker thread.
+        """
+        with STAGE_SECONDS.time(stage="routing"):
+            return self._route(question, session)
 
+    def _route(self, question: str, session: Session = None) -> str:
+        if session is not None and session.pdf_context and self.is_pdf_related(question):
+            return "pdf"
+        if self.is_grammar_or_intro_query(question):
+            return "grammar"
+        if self.knowledge_base.answers(question):
+            return "kb"
         if self.should_use_serpapi(question):
+            if session is not None and self.depends_on_history(question, session):
+                return "llm"  # SerpAPI only sees the bare question, not what "there" / "it" refers to
+            return "web"
+        if not llm_upstream.available and search_upstream.available:
+            return "web"  # LLM circuit open → a web answer beats a canned apology
+        return "llm"
+
+    def cache_scope(self, route: str, session: Session) -> str:
+        # PDF answers are only valid for the exact document they were generated from,
+        # knowledge-base answers for the index version (changes whenever a file does)
+        if route == "pdf":
+            return f"doc:{session.doc_hash}"
+        if route == "kb":
+            return f"kb:{self.knowledge_base.version}"
+        return f"global:{route}"
+
+    def cache_ttl(self, route: str) -> float | None:
+        # Web answers ("latest", "today", "news") go stale with the search result they came from
+        return SEARCH_CACHE_TTL if route == "web" else None
+
+    @staticmethod
+    def _log_question(question: str, route: str, session: Session, stream: bool = False):
+        log_event(logger, logging.INFO, "question_received", session_id=session.session_id,
+                  route=route, stream=stream, question_chars=len(question))
+        log_event(logger, logging.DEBUG, "question_text", question=question)
+
+    def _decided(self, branch: str, **fields):
+        ROUTE_DECISIONS.inc(branch=branch)
+        log_event(logger, logging.INFO, "route_decision", branch=branch, **fields)
+
+    # ---------------------------------------------------------------
+    # Conversation memory
+    def _remember(self, session: Session, question: str, answer: str):
+        """
+        Records the turn and returns a summary claim (see Session.claim_overflow)
+        for the caller to run off the request path, or None.
+        """
+        if not answer or answer.startswith("⚠️"):
+            return None
+        session.add_turn(question, answer)
+        self.sessions.save(session, document=False)
+        return session.claim_overflow()
+
+    def _finish_summary(self, session: Session, summary: str, turns: list, updated: str | None):
+        if not updated or updated.startswith("⚠️"):
+            updated = extractive_summary(summary, turns)
+        session.fold_summary(truncate_tokens(updated, SUMMARY_MAX_TOKENS), len(turns))
+        self.sessions.save(session, document=False)
+        log_event(logger, logging.INFO, "summary_updated", session_id=session.session_id,
+                  folded_turns=len(turns), summary_tokens=estimate_tokens(session.summary))
+
+    def _summarize(self, session: Session, claim):
+        # Runs on a background thread (sync path)
+        summary, turns = claim
+        updated = None
+        try:
+            with STAGE_SECONDS.time(stage="summarize"):
+                result = llm_upstream.call(self.chain.invoke, {"input": summary_prompt(summary, turns)},
+                                           timeout=LLM_TIMEOUT)
+            updated = result.content.strip() if hasattr(result, "content") else str(result).strip()
+        except Exception as e:
+            self._upstream_failed("llm", e, purpose="summary")
+        finally:
+            self._finish_summary(session, summary, turns, updated)
+
+    async def _asummarize(self, session: Session, claim):
+        summary, turns = claim
+        updated = None
+        try:
+            with STAGE_SECONDS.time(stage="summarize"):
+                result = await llm_upstream.acall(self.chain.ainvoke, {"input": summary_prompt(summary, turns)},
+                                                  timeout=LLM_TIMEOUT)
+            updated = result.content.strip() if hasattr(result, "content") else str(result).strip()
+        except Exception as e:
+            self._upstream_failed("llm", e, timeout_s=LLM_TIMEOUT, purpose="summary")
+        finally:
+            self._finish_summary(session, summary, turns, updated)
+
+    def _schedule_summary(self, session: Session, claim):
+        if claim is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._asummarize(session, claim))
+        except RuntimeError:  # no event loop → sync caller
+            threading.Thread(target=self._summarize, args=(session, claim), daemon=True).start()
+            return
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _aremember(self, session: Session, question: str, answer: str):
+        claim = await asyncio.to_thread(self._remember, session, question, answer)
+        self._schedule_summary(session, claim)
+
+    def evaluation_context(self, question: str, route: str, session: Session) -> str:
+        """
+        What an answer on `route` should be grounded in, rebuilt by the evaluation
+        workers (never on /ask). "" → only reference-free checks apply.
+        """
+        if route == "pdf":
+            return session.retriever.build_context(question) or session.pdf_context[:session.retriever.token_budget * 4]
+        if route == "kb":
+            return self.knowledge_base.build_context(question)
+        if route == "web":
+            raw = self.search_cache.peek(question)
+            return " ".join(map(str, raw)) if isinstance(raw, list) else str(raw or "")
+        return ""
+
+    def _evaluate(self, question: str, answer: str, route: str, session: Session):
+        self.evaluations.offer(question, answer, route,
+                               context=partial(self.evaluation_context, question, route, session))
+
+    def run(self, question: str, context: str = None, session_id: str = None) -> str:
+        session = self.sessions.get(session_id)
+        if context and context.strip() != session.pdf_context:
+            self.load_pdf_text(context, session_id)
+
+        route = self.route(question, session)
+        self._log_question(question, route, session)
+        scope = self.cache_scope(route, session)
+        cacheable = not self.depends_on_history(question, session)
+
+        cached = self.answer_cache.get(question, scope) if cacheable else None
+        if cached is not None:
+            log_event(logger, logging.INFO, "answer_cache_hit", route=route)
+            self._schedule_summary(session, self._remember(session, question, cached))
+            self._evaluate(question, cached, route, session)
+            return cached
+
+        started = time.perf_counter()
+        answer = self._answer(question, route, session)
+        if cacheable:
+            self.answer_cache.put(question, answer, time.perf_counter() - started, scope, self.cache_ttl(route))
+        self._schedule_summary(session, self._remember(session, question, answer))
+        self._evaluate(question, answer, route, session)
+        return answer
+
+    def _answer(self, question: str, route: str, session: Session) -> str:
+        if route == "pdf":
+            self._decided("pdf")
+            return self._invoke_chain(self.build_prompt(question, route, session))
+
+        if route == "grammar":
+            self._decided("grammar")
+            return self._invoke_chain(self.build_prompt(question, route, session))
+
+        if route == "kb":
+            self._decided("kb")
+            return self._invoke_chain(self.build_prompt(question, route, session))
+
+        if route == "web" and self.web_mode == "hedged":
+            winner, answer = self._hedge(question, route, session)
+            self._hedge_decided(winner, route)
+            return answer or "⚠️ Sorry, I couldn't generate a proper response right now."
+
+        if route == "web":
+            try:
+                serp_result = self.search_cache.get(question, self._search_upstream)
+                if serp_result:
+                    self._decided("web")
+                    return self._web_answer(serp_result, question)
+            except Exception:
+                pass  # already counted and logged by _search_upstream
+
+        self._decided("fallback", requested=route)
+        return self._invoke_chain(self.build_prompt(question, route, session))
+
+    async def arun(self, question: str, context: str = None, session_id: str = None) -> str:
+        """
+        Async twin of run(): upstream calls are awaited with timeouts and
+        CPU-bound work (embedding) runs in a worker thread, so many /ask
+        requests can be in flight on one event loop.
+        """
+        session = await asyncio.to_thread(self.sessions.get, session_id)  # disk load + index rebuild with SESSION_DIR
+        if context and context.strip() != session.pdf_context:
+            await asyncio.to_thread(self.load_pdf_text, context, session_id)
+
+        route = await asyncio.to_thread(self.route, question, session)
+        self._log_question(question, route, session)
+        scope = self.cache_scope(route, session)
+        cacheable = not self.depends_on_history(question, session)
+
+        cached = await asyncio.to_thread(self.answer_cache.get, question, scope) if cacheable else None
+        if cached is not None:
+            log_event(logger, logging.INFO, "answer_cache_hit", route=route)
+            await self._aremember(session, question, cached)
+            self._evaluate(question, cached, route, session)
+            return cached
+
+        started = time.perf_counter()
+        answer = await self._aanswer(question, route, session)
+        if cacheable:
+            await asyncio.to_thread(self.answer_cache.put, question, answer, time.perf_counter() - started, scope,
+                                    self.cache_ttl(route))
+        await self._aremember(session, question, answer)
+        self._evaluate(question, answer, route, session)
+        return answer
+
+    async def _aanswer(self, question: str, route: str, session: Session) -> str:
+        if route == "pdf":
+            self._decided("pdf")
+            prompt = await asyncio.to_thread(self.build_prompt, question, route, session)
+            return await self._ainvoke_chain(prompt)
+
+        if route == "grammar":
+            self._decided("grammar")
+            return await self._ainvoke_chain(self.build_prompt(question, route, session))
+
+        if route == "kb":
+            self._decided("kb")
+            prompt = await asyncio.to_thread(self.build_prompt, question, route, session)
+            return await self._ainvoke_chain(prompt)
+
+        if route == "web" and self.web_mode == "hedged":
+            winner, answer = await self._ahedge(question, route, session,
+                                                lambda: self._allm_branch(question, route, session))
+            self._hedge_decided(winner, route)
+            return answer or "⚠️ Sorry, I couldn't generate a proper response right now."
+
+        if route == "web":
             try:
-                serp_result = search_tool.run(question)
+                serp_result = await self._asearch(question)
                 if serp_result:
-                    print("[🌐 Real-Time Web Search Triggered]")
-                    print(f"[🔎 SerpAPI Result]: {serp_result}")
-                    return self.clean_serp_output(serp_result, question)
-            except Exception as e:
-                print(f"[❌ SerpAPI Fallback Error]: {str(e)}")
-
-        print("[💬 Falling Back to LLM]")
-        return self._invoke_chain(question)
-
-    def load_pdf_text(self, text: str):
-        self.pdf_context = text.strip()
-        print("[📎 PDF Context Loaded into RAG]")
+                    self._decided("web")
+                    return self._web_answer(serp_result, question)
+            except Exception:
+                pass  # timeouts / errors are counted and logged by _asearch_upstream
+
+        self._decided("fallback", requested=route)
+        return await self._ainvoke_chain(self.build_prompt(question, route, session))
+
+    async def astream(self, question: str, context: str = None, session_id: str = None):
+        """
+        Streaming twin of arun(): yields the answer in pieces.
+        LLM routes stream token by token; web-search answers arrive as one piece.
+        """
+        session = await asyncio.to_thread(self.sessions.get, session_id)
+        if context and context.strip() != session.pdf_context:
+            await asyncio.to_thread(self.load_pdf_text, context, session_id)
+
+        route = await asyncio.to_thread(self.route, question, session)
+        self._log_question(question, route, session, stream=True)
+        scope = self.cache_scope(route, session)
+        cacheable = not self.depends_on_history(question, session)
+
+        cached = await asyncio.to_thread(self.answer_cache.get, question, scope) if cacheable else None
+        if cached is not None:
+            log_event(logger, logging.INFO, "answer_cache_hit", route=route)
+            yield cached
+            await self._aremember(session, question, cached)
+            self._evaluate(question, cached, route, session)
+            return
+
+        started = time.perf_counter()
+        pieces = []
+        async for piece in self._astream_answer(question, route, session):
+            pieces.append(piece)
+            yield piece
+        answer = "".join(pieces).strip()
+        if cacheable:
+            await asyncio.to_thread(self.answer_cache.put, question, answer, time.perf_counter() - started, scope,
+                                    self.cache_ttl(route))
+        await self._aremember(session, question, answer)
+        self._evaluate(question, answer, route, session)
+
+    async def _astream_answer(self, question: str, route: str, session: Session):
+        if route in ("pdf", "kb"):
+            self._decided(route)
+            prompt = await asyncio.to_thread(self.build_prompt, question, route, session)
+
+        if route == "web" and self.web_mode == "hedged":
+            winner, result = await self._ahedge(question, route, session,
+                                                lambda: self._astream_llm_branch(question, route, session))
+            self._hedge_decided(winner, route)
+            if winner is None:
+                yield "⚠️ Sorry, I couldn't generate a proper response right now."
+            elif winner == "web":
+                yield result
+            else:
+                first, stream = result
+                yield first
+                async for piece in stream:
+                    yield piece
+            return
+
+        if route == "web":
+            try:
+                serp_result = await self._asearch(question)
+                if serp_result:
+                    self._decided("web")
+                    yield self._web_answer(serp_result, question)
+                    return
+            except Exception:
+                pass  # timeouts / errors are counted and logged by _asearch_upstream
+
+        if route == "grammar":
+            self._decided("grammar")
+        elif route not in ("pdf", "kb"):
+            self._decided("fallback", requested=route)
+        if route not in ("pdf", "kb"):
+            prompt = self.build_prompt(question, route, session)
+
+        async for piece in self._astream_chain(prompt):
+            yield piece
+
+    def load_pdf_text(self, text: str, session_id: str = None) -> Session:
+        session = self.sessions.get(session_id)
+        session.load_pdf_text(text)
+        self.sessions.save(session)
+        self.sessions.enforce_limits()
+        return session
 
 # ✅ Export Singleton
 rag_chain = RAGChainWithContext()
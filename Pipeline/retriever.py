@@ -0,0 +1,133 @@
+import numpy as np
+
+from Backend.core.config import (
+    EMBEDDING_MODEL_NAME,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    RETRIEVAL_TOP_K,
+    CONTEXT_TOKEN_BUDGET,
+)
+from knowledgeBase.Evaluators.embedding_service import embedding_service
+from Pipeline.content_cache import content_cache, text_sha256
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough tokenizer-free estimate (~4 characters per token for English text)
+    return max(1, len(text) // 4)
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Splits text into overlapping character windows, preferring to cut on
+    whitespace so words are not broken in half.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if overlap >= chunk_size:
+        raise ValueError("chunk overlap must be smaller than chunk size")
+
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + chunk_size // 2, end)
+            if cut != -1:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 and text[next_start - 1] != " " else next_start
+    return chunks
+
+
+class PDFRetriever:
+    """
+    In-memory FAISS index over the chunks of one uploaded document.
+    Embeddings are L2-normalised so inner product == cosine similarity.
+    """
+
+    def __init__(self, top_k: int = RETRIEVAL_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.chunks = []
+        self.vectors = None
+        self.index = None
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def nbytes(self) -> int:
+        # Approximate resident size: chunk text + embeddings (FAISS flat index holds a second copy)
+        vector_bytes = 2 * self.vectors.nbytes if self.vectors is not None else 0
+        return sum(len(c) for c in self.chunks) + vector_bytes
+
+    def clear(self):
+        self.chunks = []
+        self.vectors = None
+        self.index = None
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return embedding_service.encode(texts)
+
+    def build(self, text: str):
+        self.clear()
+        # Embeddings depend on the text, the model and the chunking → all part of the key
+        key = text_sha256(text.strip(), EMBEDDING_MODEL_NAME, str(CHUNK_SIZE), str(CHUNK_OVERLAP))
+        cached = content_cache.get_embeddings(key)
+        if cached is not None:
+            self.load(*cached)
+            return
+
+        chunks = chunk_text(text)
+        if not chunks:
+            return
+
+        vectors = self.embed(chunks)
+        content_cache.put_embeddings(key, chunks, vectors)
+        self.load(chunks, vectors)
+
+    def load(self, chunks: list[str], vectors: np.ndarray):
+        """
+        Rebuilds the index from already-computed embeddings (no model call).
+        """
+        import faiss
+
+        self.clear()
+        if not chunks:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+
+        self.chunks = chunks
+        self.vectors = vectors
+        self.index = index
+
+    def search(self, question: str, top_k: int = None) -> list[tuple[int, float]]:
+        if self.index is None:
+            return []
+        k = min(top_k or self.top_k, len(self.chunks))
+        query = self.embed([question])
+        scores, ids = self.index.search(query, k)
+        return [(int(i), float(s)) for i, s in zip(ids[0], scores[0]) if i != -1]
+
+    def build_context(self, question: str, token_budget: int = None) -> str:
+        """
+        Returns the best-matching chunks that fit in the token budget,
+        re-ordered by their position in the document so the text reads naturally.
+        """
+        budget = token_budget or self.token_budget
+        selected, used = [], 0
+        for chunk_id, _ in self.search(question):
+            cost = estimate_tokens(self.chunks[chunk_id])
+            if used + cost > budget:
+                continue
+            selected.append(chunk_id)
+            used += cost
+        return "\n...\n".join(self.chunks[i] for i in sorted(selected))
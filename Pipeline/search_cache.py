@@ -0,0 +1,216 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from Backend.core.config import (
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_STALE_TTL,
+    SEARCH_CACHE_SWR,
+)
+from Backend.core.logger import get_logger, log_event
+from Backend.core.metrics import CACHE_EVENTS
+from Pipeline.answer_cache import normalize_prompt
+
+logger = get_logger("search_cache")
+
+
+class _Flight:
+    # One in-flight sync fetch: its waiters get the leader's result or exception
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchCache:
+    """
+    Short-lived cache in front of SerpAPI.
+
+    - Fresh entries (age < ttl) are served directly.
+    - With stale-while-revalidate on, entries up to ttl + stale_ttl old are
+      served immediately while one background refresh runs.
+    - Concurrent misses for the same normalized query share a single
+      upstream call instead of each hitting SerpAPI.
+    """
+
+    def __init__(self, max_entries: int = SEARCH_CACHE_SIZE, ttl: float = SEARCH_CACHE_TTL,
+                 stale_ttl: float = SEARCH_CACHE_STALE_TTL, stale_while_revalidate: bool = SEARCH_CACHE_SWR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries = OrderedDict()  # normalized query -> (result, fetched_at)
+        self._inflight = {}            # normalized query -> asyncio.Task (async path)
+        self._sync_inflight = {}       # normalized query -> _Flight (sync path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key: str, count: bool = True):
+        """
+        Returns (result, state) with state in {"fresh", "stale", None}.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None, None
+            result, fetched_at = item
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += count
+                if count:
+                    CACHE_EVENTS.inc(cache="search", result="hit")
+                return result, "fresh"
+            if self.stale_while_revalidate and age < self.ttl + self.stale_ttl:
+                self.stale_hits += count
+                if count:
+                    CACHE_EVENTS.inc(cache="search", result="stale")
+                return result, "stale"
+            del self._entries[key]
+            return None, None
+
+    def peek(self, query: str):
+        # Cached result (fresh or stale) without counting a lookup or fetching → evaluation, debugging
+        result, _ = self._lookup(normalize_prompt(query), count=False)
+        return result
+
+    def _store(self, key: str, result):
+        # Empty results are usually upstream hiccups → don't pin them for a whole TTL
+        if not result:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # ---------------------------------------------------------------
+    # Async path (used by arun / astream)
+    def _start_fetch(self, key: str, query: str, fetch) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            return task
+
+        async def runner():
+            try:
+                result = await fetch(query)
+                self._store(key, result)
+                return result
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(runner())
+        task.add_done_callback(self._log_failure)
+        self._inflight[key] = task
+        return task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        # Also marks the exception as retrieved for background refreshes nobody awaits;
+        # the failure itself is already counted and logged by the fetch function
+        if not task.cancelled() and task.exception() is not None:
+            log_event(logger, logging.DEBUG, "search_fetch_failed", error=str(task.exception()))
+
+    async def aget(self, query: str, fetch):
+        """
+        `fetch` is an async callable taking the raw query and returning the SerpAPI result.
+        """
+        key = normalize_prompt(query)
+        result, state = self._lookup(key)
+        if state == "fresh":
+            return result
+        if state == "stale":
+            self._start_fetch(key, query, fetch)
+            return result
+
+        with self._lock:
+            if key in self._inflight:
+                self.coalesced += 1
+                CACHE_EVENTS.inc(cache="search", result="coalesced")
+            else:
+                self.misses += 1
+                CACHE_EVENTS.inc(cache="search", result="miss")
+        task = self._start_fetch(key, query, fetch)
+        # shield → a caller timing out or disconnecting doesn't cancel the shared fetch
+        return await asyncio.shield(task)
+
+    # ---------------------------------------------------------------
+    # Sync path (used by run)
+    def _lead(self, key: str, query: str, fetch, flight: "_Flight"):
+        try:
+            flight.result = fetch(query)
+            self._store(key, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync_inflight.pop(key, None)
+            flight.done.set()
+
+    def _revalidate(self, key: str, query: str, fetch, flight: "_Flight"):
+        try:
+            self._lead(key, query, fetch, flight)
+        except Exception as e:
+            # Already counted and logged by the fetch function; the stale entry stays in place
+            log_event(logger, logging.DEBUG, "search_fetch_failed", error=str(e))
+
+    def get(self, query: str, fetch):
+        """
+        `fetch` is a blocking callable taking the raw query. Stale hits are served
+        while one background thread revalidates; concurrent misses share a single
+        leader's fetch and its outcome, exception included (like the shared task
+        of aget). Only calls arriving after it finished start a new fetch.
+        """
+        key = normalize_prompt(query)
+        result, state = self._lookup(key)
+        if state == "stale":
+            with self._lock:
+                flight = None
+                if key not in self._sync_inflight:
+                    flight = self._sync_inflight[key] = _Flight()
+            if flight is not None:
+                threading.Thread(target=contextvars.copy_context().run,
+                                 args=(self._revalidate, key, query, fetch, flight),
+                                 name="search-revalidate", daemon=True).start()
+        if state is not None:
+            return result
+
+        with self._lock:
+            flight = self._sync_inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync_inflight[key] = _Flight()
+                self.misses += 1
+                CACHE_EVENTS.inc(cache="search", result="miss")
+            else:
+                self.coalesced += 1
+                CACHE_EVENTS.inc(cache="search", result="coalesced")
+        if leader:
+            return self._lead(key, query, fetch, flight)
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            }
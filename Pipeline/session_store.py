@@ -0,0 +1,315 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from Backend.core.config import (
+    SESSION_MAX_COUNT,
+    SESSION_MAX_BYTES,
+    SESSION_DIR,
+    SESSION_DISK_MAX_COUNT,
+    SESSION_DISK_TTL,
+    MEMORY_RECENT_TURNS,
+)
+from Backend.core.logger import get_logger, log_event
+from Pipeline.conversation_memory import pair_turns
+from Pipeline.retriever import PDFRetriever
+
+logger = get_logger("sessions")
+
+DEFAULT_SESSION_ID = "default"
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def document_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text else ""
+
+
+def validate_session_id(session_id: str) -> str:
+    if not _SESSION_ID_PATTERN.match(session_id or ""):
+        raise ValueError("session id must be 1-64 characters of letters, digits, '-' or '_'")
+    return session_id
+
+
+def _tmp_path(path: str) -> str:
+    # Unique per process and thread → two uvicorn workers saving one session never share a temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _write_json(path: str, data: dict):
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _new_memory():
+    # Imported lazily → LangChain loads with the first session, not at startup
+    from langchain.memory import ConversationBufferMemory
+    return ConversationBufferMemory(memory_key="history", return_messages=True)
+
+
+class Session:
+    """
+    Everything that used to live on the rag_chain singleton for one user:
+    document text, its retrieval index and the conversation memory.
+
+    Memory is split in two: the most recent turns verbatim (in `memory`) and a
+    rolling `summary` of everything older, which is folded in off the request path.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.pdf_context = ""
+        self.doc_hash = ""
+        self.retriever = PDFRetriever()
+        self.memory = _new_memory()
+        self.summary = ""
+        self.summarizing = False
+        self.lock = threading.RLock()
+        self.last_access = time.time()
+        self.disk_mtime = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        history = sum(len(str(m.content)) for m in self.memory.chat_memory.messages)
+        return len(self.pdf_context) + self.retriever.nbytes + history + len(self.summary)
+
+    def load_pdf_text(self, text: str):
+        with self.lock:
+            self.pdf_context = text.strip()
+            self.doc_hash = document_hash(self.pdf_context)
+            try:
+                self.retriever.build(self.pdf_context)
+                log_event(logger, logging.INFO, "pdf_context_loaded", session_id=self.session_id,
+                          chunks=len(self.retriever), chars=len(self.pdf_context))
+            except Exception as e:
+                self.retriever.clear()
+                log_event(logger, logging.ERROR, "pdf_indexing_error", session_id=self.session_id, error=str(e))
+
+    # ---------------------------------------------------------------
+    # Conversation memory
+    def add_turn(self, question: str, answer: str):
+        with self.lock:
+            self.memory.chat_memory.add_user_message(question)
+            self.memory.chat_memory.add_ai_message(answer)
+
+    def turns(self) -> list[tuple[str, str]]:
+        with self.lock:
+            return pair_turns(self.memory.chat_memory.messages)
+
+    def claim_overflow(self, keep: int = MEMORY_RECENT_TURNS):
+        """
+        Returns (summary, turns_to_fold) once at least `keep` turns have piled up
+        beyond the `keep` most recent ones (→ one summary update per `keep` turns),
+        and marks the update as running. None if there is nothing to fold yet or
+        another update is already running. Every claim must end with fold_summary().
+        """
+        with self.lock:
+            if self.summarizing:
+                return None
+            turns = pair_turns(self.memory.chat_memory.messages)
+            if len(turns) - keep < max(1, keep):
+                return None
+            self.summarizing = True
+            return self.summary, turns[:len(turns) - keep]
+
+    def fold_summary(self, summary: str, folded: int):
+        # Only add_turn() appends meanwhile, so the folded turns are still the oldest messages
+        with self.lock:
+            messages = self.memory.chat_memory.messages
+            cut, answers = 0, 0
+            while cut < len(messages) and answers < folded:
+                answers += messages[cut].type == "ai"
+                cut += 1
+            self.memory.chat_memory.messages = messages[cut:]
+            self.summary = summary
+            self.summarizing = False
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of sessions bounded by count and by approximate memory size.
+
+    With SESSION_DIR set, sessions are also written to disk so every uvicorn
+    worker sees the same document and history. Embeddings are stored as .npy
+    files, so a worker picking up a session rebuilds its index without
+    re-encoding the document. The document (document.json + vectors.npy) and
+    the conversation (history.json) are separate files: a turn rewrites only
+    the small history file. Whenever sessions are evicted from memory, the
+    directory is pruned too: sessions idle for `disk_ttl` seconds go, then the
+    least recently written ones beyond `max_disk_sessions` (never one this
+    worker still holds in memory).
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_COUNT, max_bytes: int = SESSION_MAX_BYTES, directory: str = SESSION_DIR,
+                 max_disk_sessions: int = SESSION_DISK_MAX_COUNT, disk_ttl: float = SESSION_DISK_TTL):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_sessions = max_disk_sessions
+        self.disk_ttl = disk_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    # ---------------------------------------------------------------
+    # In-memory LRU
+    def get(self, session_id: str = None) -> Session:
+        session_id = validate_session_id(session_id or DEFAULT_SESSION_ID)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and not self._is_stale(session):
+                self._sessions.move_to_end(session_id)
+                session.last_access = time.time()
+                return session
+
+            session = self._load_from_disk(session_id) or Session(session_id)
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            evicted = self._evict()
+        if evicted:
+            self._prune_disk()
+        return session
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self.directory:
+                shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(s.nbytes for s in self._sessions.values())
+
+    def enforce_limits(self):
+        # Sessions grow after get() (new document, longer history) → re-check the caps
+        with self._lock:
+            evicted = self._evict()
+        if evicted:
+            self._prune_disk()
+
+    def _evict(self) -> int:
+        # Always keep the most recently used session, even if it alone exceeds the byte cap
+        total = self.total_bytes()
+        evicted = 0
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or total > self.max_bytes):
+            session_id, session = self._sessions.popitem(last=False)
+            total -= session.nbytes
+            evicted += 1
+            log_event(logger, logging.INFO, "session_evicted", session_id=session_id)
+        return evicted
+
+    # ---------------------------------------------------------------
+    # Optional on-disk backing store
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.directory, session_id)
+
+    def _prune_disk(self):
+        if not self.directory:
+            return
+        now = time.time()
+        with self._lock:
+            in_memory = set(self._sessions)
+        on_disk = []
+        for session_id in os.listdir(self.directory):
+            if session_id not in in_memory and os.path.isdir(self._session_dir(session_id)):
+                # Directory mtime moves whenever a file in it is replaced → time of the last save
+                try:
+                    on_disk.append((os.path.getmtime(self._session_dir(session_id)), session_id))
+                except OSError:
+                    pass
+        on_disk.sort()
+        excess = len(on_disk) + len(in_memory) - self.max_disk_sessions
+        for i, (mtime, session_id) in enumerate(on_disk):
+            if i >= excess and now - mtime < self.disk_ttl:
+                break
+            shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+            log_event(logger, logging.INFO, "session_pruned", session_id=session_id)
+
+    def _disk_mtime(self, session_id: str) -> float:
+        # Newest of the session's files; 0.0 when it has none on disk
+        mtime = 0.0
+        for name in ("document.json", "history.json"):
+            try:
+                mtime = max(mtime, os.path.getmtime(os.path.join(self._session_dir(session_id), name)))
+            except OSError:
+                pass
+        return mtime
+
+    def _is_stale(self, session: Session) -> bool:
+        if not self.directory:
+            return False
+        return self._disk_mtime(session.session_id) > session.disk_mtime
+
+    def save(self, session: Session, document: bool = True):
+        """
+        document=False rewrites only history.json (history / summary changes),
+        leaving the document text, chunks and embeddings untouched on disk.
+        """
+        if not self.directory:
+            return
+        path = self._session_dir(session.session_id)
+        os.makedirs(path, exist_ok=True)
+        from langchain_core.messages import messages_to_dict
+
+        with session.lock:
+            if document:
+                if session.retriever.vectors is not None:
+                    vectors_path = os.path.join(path, "vectors.npy")
+                    tmp = _tmp_path(vectors_path)
+                    with open(tmp, "wb") as f:
+                        np.save(f, session.retriever.vectors)
+                    os.replace(tmp, vectors_path)
+                # document.json is written after the vectors so readers never see chunks without them
+                _write_json(os.path.join(path, "document.json"),
+                            {"pdf_context": session.pdf_context, "chunks": session.retriever.chunks})
+            _write_json(os.path.join(path, "history.json"), {
+                "history": messages_to_dict(session.memory.chat_memory.messages),
+                "summary": session.summary,
+            })
+            session.disk_mtime = self._disk_mtime(session.session_id)
+
+    def _load_from_disk(self, session_id: str):
+        if not self.directory:
+            return None
+        path = self._session_dir(session_id)
+        mtime = self._disk_mtime(session_id)
+        if not mtime:
+            return None
+        from langchain_core.messages import messages_from_dict
+
+        try:
+            session = Session(session_id)
+            document_path = os.path.join(path, "document.json")
+            if os.path.exists(document_path):
+                with open(document_path, encoding="utf-8") as f:
+                    document = json.load(f)
+                session.pdf_context = document.get("pdf_context", "")
+                session.doc_hash = document_hash(session.pdf_context)
+                chunks = document.get("chunks", [])
+                vectors_path = os.path.join(path, "vectors.npy")
+                if chunks and os.path.exists(vectors_path):
+                    session.retriever.load(chunks, np.load(vectors_path))
+            history_path = os.path.join(path, "history.json")
+            if os.path.exists(history_path):
+                with open(history_path, encoding="utf-8") as f:
+                    history = json.load(f)
+                session.memory.chat_memory.messages = messages_from_dict(history.get("history", []))
+                session.summary = history.get("summary", "")
+            session.disk_mtime = mtime
+            return session
+        except Exception as e:
+            log_event(logger, logging.ERROR, "session_load_error", session_id=session_id, error=str(e))
+            return None
@@ -0,0 +1,99 @@
+import threading
+
+from Backend.core.config import (
+    LLM_TIMEOUT,
+    SEARCH_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_KEEPALIVE_EXPIRY,
+    LLM_MAX_CONCURRENCY,
+    SEARCH_MAX_CONCURRENCY,
+)
+from Backend.core.resilience import Upstream
+
+# ✅ One guard per upstream → shared by every request, session and code path in this process
+llm_upstream = Upstream("llm", LLM_MAX_CONCURRENCY)
+search_upstream = Upstream("serpapi", SEARCH_MAX_CONCURRENCY)
+
+_lock = threading.Lock()
+_http_client = None
+_async_http_client = None
+
+
+def _limits():
+    import httpx
+
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+
+
+def get_http_client():
+    """
+    Shared keep-alive httpx.Client for sync upstream calls (TLS handshakes
+    are paid once per connection, not once per request).
+    """
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                import httpx
+                _http_client = httpx.Client(limits=_limits(), timeout=max(LLM_TIMEOUT, SEARCH_TIMEOUT))
+    return _http_client
+
+
+def get_async_http_client():
+    # Async twin of get_http_client(); its connections belong to the server's event loop
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                import httpx
+                _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=max(LLM_TIMEOUT, SEARCH_TIMEOUT))
+    return _async_http_client
+
+
+def build_chat_groq(model: str, api_key: str):
+    from langchain_groq import ChatGroq
+
+    # Retries belong to llm_upstream (budgeted, breaker-aware) → none inside the SDK
+    return ChatGroq(model=model, api_key=api_key, max_retries=0, timeout=LLM_TIMEOUT,
+                    http_client=get_http_client(), http_async_client=get_async_http_client())
+
+
+class PooledSerpAPI:
+    """
+    SerpAPIWrapper's query parameters and result parsing, sent over the shared
+    httpx pools: the stock wrapper opens a new connection per search and its
+    sync client has no real timeout.
+    """
+
+    ENDPOINT = "https://serpapi.com/search"
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+
+    def run(self, query: str):
+        response = get_http_client().get(self.ENDPOINT, params=self.wrapper.get_params(query), timeout=SEARCH_TIMEOUT)
+        response.raise_for_status()
+        return self.wrapper._process_response(response.json())
+
+    async def arun(self, query: str):
+        response = await get_async_http_client().get(self.ENDPOINT, params=self.wrapper.get_params(query),
+                                                     timeout=SEARCH_TIMEOUT)
+        response.raise_for_status()
+        return self.wrapper._process_response(response.json())
+
+
+def upstream_states() -> dict:
+    return {u.name: u.state() for u in (llm_upstream, search_upstream)}
+
+
+async def close_clients():
+    global _http_client, _async_http_client
+    with _lock:
+        client, _http_client = _http_client, None
+        async_client, _async_http_client = _async_http_client, None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
@@ -0,0 +1,58 @@
+"""
+Diff two benchmark result files:
+
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import json
+import sys
+
+# Latency-like keys: lower is better. Throughput: higher is better.
+_LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms",
+                    "last_turns_p50_ms", "prompt_tokens_max", "load_from_disk_ms",
+                    "median_us", "score_dataset_per_row_us", "check_toxicity_batch_per_text_us")
+_HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def _flatten(tree: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in tree.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.05) -> list[dict]:
+    """
+    Returns one row per comparable metric with the relative change;
+    `verdict` is "better" / "worse" when the change exceeds `threshold`.
+    """
+    old = _flatten({k: baseline.get(k, {}) for k in ("micro", "load")})
+    new = _flatten({k: current.get(k, {}) for k in ("micro", "load")})
+    rows = []
+    for path in sorted(old.keys() & new.keys()):
+        metric = path.rsplit(".", 1)[-1]
+        if metric not in _LOWER_IS_BETTER + _HIGHER_IS_BETTER or not old[path]:
+            continue
+        change = (new[path] - old[path]) / old[path]
+        improved = change < 0 if metric in _LOWER_IS_BETTER else change > 0
+        verdict = "same" if abs(change) < threshold else ("better" if improved else "worse")
+        rows.append({"metric": path, "baseline": old[path], "current": new[path],
+                     "change": round(change, 4), "verdict": verdict})
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    width = max((len(r["metric"]) for r in rows), default=10)
+    for r in rows:
+        print(f"{r['metric']:<{width}}  {r['baseline']:>12.3f} → {r['current']:>12.3f}  "
+              f"{r['change'] * 100:+7.1f}%  {r['verdict']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m benchmarks.compare BASELINE.json CURRENT.json")
+    with open(sys.argv[1], encoding="utf-8") as a, open(sys.argv[2], encoding="utf-8") as b:
+        print_comparison(compare(json.load(a), json.load(b)))
@@ -0,0 +1,146 @@
+import os
+import random
+
+_VOCAB = (
+    "system model data cache latency network request response index vector query "
+    "document report revenue quarter growth customer product market policy method "
+    "result analysis summary section figure table value increase decrease average "
+    "process service memory storage thread batch stream token page chapter review"
+).split()
+
+# One template list per branch of RAGChainWithContext.route()
+QUESTIONS = {
+    "pdf": [
+        "What does the report say about {a} in this document?",
+        "According to the document, how did {a} affect {b}?",
+        "Summarize the {a} section as per the pdf.",
+    ],
+    "grammar": [
+        "What is the polite way to ask about {a}?",
+        "How to say {a} on the phone?",
+        "Is it okay to say {a} in an email?",
+    ],
+    "web": [
+        "What is the latest news about {a}?",
+        "Who is the current leader in {a} {b}?",
+        "How many {a} were sold today?",
+    ],
+    "llm": [
+        "Explain the difference between {a} and {b} with an example step by step.",
+        "Write a short paragraph that compares {a}, {b} and their typical trade-offs in practice.",
+        "Why would a team choose {a} over {b} for a large internal project?",
+    ],
+}
+
+DEFAULT_MIX = {"pdf": 0.25, "grammar": 0.15, "web": 0.3, "llm": 0.3}
+
+
+def synthetic_text(paragraphs: int = 20, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    for p in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = [rng.choice(_VOCAB) for _ in range(rng.randint(8, 18))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        out.append(f"Section {p + 1}. " + " ".join(sentences))
+    return "\n\n".join(out)
+
+
+def generate_questions(count: int, mix: dict = None, repeat_ratio: float = 0.0, seed: int = 0) -> list[tuple[str, str]]:
+    """
+    Returns `count` (expected_route, question) pairs drawn from `mix`.
+    With `repeat_ratio`, that share of questions comes from a small hot set,
+    which is what exercises the answer / search caches.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    routes, weights = zip(*mix.items())
+
+    def fresh():
+        route = rng.choices(routes, weights)[0]
+        template = rng.choice(QUESTIONS[route])
+        return route, template.format(a=rng.choice(_VOCAB), b=rng.choice(_VOCAB))
+
+    hot = [fresh() for _ in range(8)]
+    return [rng.choice(hot) if rng.random() < repeat_ratio else fresh() for _ in range(count)]
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(path: str, pages: int = 5, seed: int = 0, lines_per_page: int = 40) -> str:
+    """
+    Minimal PDF with a real text layer (Helvetica), written by hand so the
+    corpus needs no PDF library. pdfplumber extracts it without OCR.
+    """
+    rng = random.Random(seed)
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(_VOCAB) for _ in range(12)) for _ in range(lines_per_page)]
+        body = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{body}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+
+    data, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def write_scanned_pdf(path: str, pages: int = 3, seed: int = 0, dpi: int = 150) -> str:
+    """
+    Image-only PDF (no text layer), like a scanner produces → forces the OCR path.
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    width, height = int(8.27 * dpi), int(11.69 * dpi)
+    images = []
+    for _ in range(pages):
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        for row in range(30):
+            line = " ".join(rng.choice(_VOCAB) for _ in range(8))
+            draw.text((dpi // 2, dpi // 2 + row * dpi // 3), line, fill=0)
+        images.append(image.convert("RGB"))
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+    return path
+
+
+def build_corpus(directory: str, text_pdfs: int = 4, text_pages: int = 5, scanned_pdfs: int = 2,
+                 scanned_pages: int = 2, seed: int = 0) -> dict:
+    """
+    Writes a reproducible PDF corpus under `directory`. Every file differs
+    (seeded by index), so the first pass over it is cold for the content cache.
+    Scanned PDFs are skipped if Pillow isn't installed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    corpus = {"text": [], "scanned": [], "skipped": []}
+    for i in range(text_pdfs):
+        corpus["text"].append(write_text_pdf(os.path.join(directory, f"text_{seed}_{i}.pdf"), text_pages, seed * 1000 + i))
+    for i in range(scanned_pdfs):
+        try:
+            corpus["scanned"].append(
+                write_scanned_pdf(os.path.join(directory, f"scanned_{seed}_{i}.pdf"), scanned_pages, seed * 1000 + i)
+            )
+        except ImportError as e:
+            corpus["skipped"].append(f"scanned PDFs: {e}")
+            break
+    return corpus
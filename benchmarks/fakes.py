@@ -0,0 +1,143 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+from Pipeline.conversation_memory import SUMMARY_PROMPT_PREFIX
+
+_WORDS = (
+    "answer context model latency request token search result document page "
+    "python service cache index vector query stream summary detail example step"
+).split()
+
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatGroq:
+    """
+    Stands in for the `prompt | ChatGroq(...)` chain: same invoke / ainvoke / astream
+    surface, no network. Latency is `latency_ms` (± jitter) before the first token,
+    then `token_ms` per token, so invoke() costs the same as a full stream.
+    """
+
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 50, tokens: int = 40,
+                 token_ms: float = 10, fail_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.summary_calls = 0
+        self.prompt_chars = deque(maxlen=10000)  # answer prompts only, in arrival order
+
+    def _plan(self, prompt: str):
+        with self._lock:
+            self.calls += 1
+            if prompt.startswith(SUMMARY_PROMPT_PREFIX):
+                self.summary_calls += 1
+            else:
+                self.prompt_chars.append(len(prompt))
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.fail_rate
+        words = prompt.split()[:8] + [_WORDS[(len(prompt) + i) % len(_WORDS)] for i in range(self.tokens)]
+        return delay, failed, [w + " " for w in words[:self.tokens]]
+
+    def invoke(self, inputs: dict) -> FakeMessage:
+        delay, failed, tokens = self._plan(inputs["input"])
+        time.sleep(delay + len(tokens) * self.token_ms / 1000)
+        if failed:
+            raise RuntimeError("fake LLM failure")
+        return FakeMessage("".join(tokens))
+
+    async def ainvoke(self, inputs: dict) -> FakeMessage:
+        delay, failed, tokens = self._plan(inputs["input"])
+        await asyncio.sleep(delay + len(tokens) * self.token_ms / 1000)
+        if failed:
+            raise RuntimeError("fake LLM failure")
+        return FakeMessage("".join(tokens))
+
+    async def astream(self, inputs: dict):
+        delay, failed, tokens = self._plan(inputs["input"])
+        await asyncio.sleep(delay)
+        if failed:
+            raise RuntimeError("fake LLM failure")
+        for token in tokens:
+            yield FakeMessage(token)
+            await asyncio.sleep(self.token_ms / 1000)
+
+
+class FakeSerpAPI:
+    """
+    Stands in for SerpAPIWrapper (and the Tool wrapping it): run() / arun()
+    return canned snippets after `latency_ms` (± jitter). `empty_rate` returns ""
+    the way SerpAPI does when it finds nothing useful.
+    """
+
+    def __init__(self, latency_ms: float = 150, jitter_ms: float = 30, fail_rate: float = 0.0,
+                 empty_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.empty_rate = empty_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _plan(self, query: str):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            roll = self._random.random()
+        if roll < self.fail_rate:
+            return delay, None
+        if roll < self.fail_rate + self.empty_rate:
+            return delay, ""
+        return delay, serp_snippets(query)
+
+    def run(self, query: str):
+        delay, result = self._plan(query)
+        time.sleep(delay)
+        if result is None:
+            raise RuntimeError("fake SerpAPI failure")
+        return result
+
+    async def arun(self, query: str):
+        delay, result = self._plan(query)
+        await asyncio.sleep(delay)
+        if result is None:
+            raise RuntimeError("fake SerpAPI failure")
+        return result
+
+
+def serp_snippets(query: str) -> list[str]:
+    # Shaped like SerpAPIWrapper output: a list of organic snippets with some noise
+    topic = " ".join(query.split()[-3:])
+    return [
+        f"['{topic.title()} - Overview']",
+        f"According to recent reports, {topic} has changed significantly over the last year.",
+        f"1. Check the official source for {topic}. 2. Compare the latest figures. 3. Review the trend.",
+        f"Experts say {topic} will continue to be an important topic for many people in the coming months.",
+        "Short.",
+    ]
+
+
+def install(llm: FakeChatGroq = None, search: FakeSerpAPI = None):
+    """
+    Points the shared rag_chain at the fakes, so nothing reaches Groq or SerpAPI.
+    Returns the (llm, search) pair that was installed.
+    """
+    import Pipeline.rag_chain as rag_module
+
+    llm = llm or FakeChatGroq()
+    search = search or FakeSerpAPI()
+    rag_module.rag_chain._chain = llm
+    rag_module._search = search
+    rag_module._search_tool = search  # the sync path only needs .run()
+    return llm, search
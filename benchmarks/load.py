@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from benchmarks.corpus import generate_questions, synthetic_text
+
+
+def summarize(latencies: list[float], statuses: dict, elapsed: float, **extra) -> dict:
+    """
+    latencies are seconds per successful request; percentiles are reported in ms.
+    """
+    ms = np.asarray(latencies, dtype="float64") * 1000
+    summary = {
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "statuses": {str(k): v for k, v in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+    if len(ms):
+        summary.update({
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "max_ms": round(float(ms.max()), 2),
+        })
+    summary.update(extra)
+    return summary
+
+
+async def _drive(jobs: list, concurrency: int, send):
+    """
+    Runs `send(job)` for every job with at most `concurrency` in flight.
+    `send` returns (status, seconds, extra_dict_or_None).
+    """
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    latencies, statuses, extras = [], {}, []
+
+    async def worker():
+        while True:
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                status, seconds, extra = await send(job)
+            except Exception as e:
+                status, seconds, extra = type(e).__name__, None, None
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(seconds)
+                if extra:
+                    extras.append(extra)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, extras, time.perf_counter() - started
+
+
+def _client(app=None, base_url: str = None, timeout: float = 120.0):
+    import httpx
+
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=timeout)
+    # In-process ASGI: no sockets, so network noise stays out of the numbers
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+
+
+async def prepare_sessions(sessions: int, paragraphs: int = 40):
+    # PDF-route questions need a document in the session; load them outside the timed window
+    from Pipeline.rag_chain import rag_chain
+
+    for i in range(sessions):
+        await asyncio.to_thread(rag_chain.load_pdf_text, synthetic_text(paragraphs, seed=i), f"bench-{i}")
+
+
+async def bench_ask(app=None, base_url: str = None, requests: int = 200, concurrency: int = 16,
+                    sessions: int = 4, repeat_ratio: float = 0.2, stream: bool = False,
+                    warmup: int = 5, seed: int = 0) -> dict:
+    """
+    POSTs a mixed-route question corpus to /ask (or /ask/stream) and reports
+    latency percentiles. For streams against a real server (`base_url`),
+    time-to-first-token is reported too; httpx.ASGITransport hands over the
+    body only once the whole response is done, so in-process TTFT would just
+    repeat the total latency and is left out.
+    """
+    questions = generate_questions(requests + warmup, repeat_ratio=repeat_ratio, seed=seed)
+    jobs = [(i, q) for i, (_, q) in enumerate(questions)]
+    path = "/ask/stream" if stream else "/ask"
+
+    async with _client(app, base_url) as client:
+        async def send(job):
+            i, question = job
+            body = {"question": question, "session_id": f"bench-{i % sessions}"}
+            started = time.perf_counter()
+            if not stream:
+                response = await client.post(path, json=body)
+                return response.status_code, time.perf_counter() - started, None
+            ttft = None
+            async with client.stream("POST", path, json=body) as response:
+                async for line in response.aiter_lines():
+                    if ttft is None and line.startswith("data:"):
+                        ttft = time.perf_counter() - started
+                return response.status_code, time.perf_counter() - started, {"ttft": ttft}
+
+        await _drive(jobs[:warmup], min(concurrency, max(1, warmup)), send)
+        latencies, statuses, extras, elapsed = await _drive(jobs[warmup:], concurrency, send)
+
+    extra = {"endpoint": path, "concurrency": concurrency, "repeat_ratio": repeat_ratio}
+    if stream and not base_url:
+        extra["ttft"] = "not measured in-process (ASGITransport buffers the response), use --base-url"
+    elif stream and extras:
+        ttft_ms = np.asarray([e["ttft"] for e in extras if e["ttft"] is not None]) * 1000
+        if len(ttft_ms):
+            extra["ttft_p50_ms"] = round(float(np.percentile(ttft_ms, 50)), 2)
+            extra["ttft_p95_ms"] = round(float(np.percentile(ttft_ms, 95)), 2)
+            extra["ttft_p99_ms"] = round(float(np.percentile(ttft_ms, 99)), 2)
+    return summarize(latencies, statuses, elapsed, **extra)
+
+
+async def bench_upload(pdf_paths: list[str], app=None, base_url: str = None, requests: int = 20,
+                       concurrency: int = 2, background: bool = False) -> dict:
+    """
+    Uploads PDFs from the corpus round-robin. The first pass over the corpus is
+    cold; later passes hit the content cache, so `requests` > len(pdf_paths)
+    measures both. 429s (ingestion limit) are counted, not retried.
+    """
+    payloads = []
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            payloads.append((path.rsplit("/", 1)[-1], f.read()))
+    jobs = [(i, payloads[i % len(payloads)]) for i in range(requests)]
+
+    async with _client(app, base_url) as client:
+        async def send(job):
+            i, (name, data) = job
+            started = time.perf_counter()
+            response = await client.post(
+                "/upload",
+                params={"session_id": f"bench-upload-{i}", "background": str(background).lower()},
+                files={"file": (name, data, "application/pdf")},
+            )
+            if response.status_code != 200:
+                return response.status_code, None, None
+            body = response.json()
+            # /upload reports read / extraction failures as 200 + "error"
+            if "error" in body:
+                return "error", None, None
+            job_id = body.get("job_id")
+            while job_id:
+                status = (await client.get(f"/upload/status/{job_id}")).json()
+                if status.get("status") not in ("queued", "running"):
+                    if status.get("status") != "done":
+                        return f"job_{status.get('status')}", None, None
+                    break
+                await asyncio.sleep(0.05)
+            return 200, time.perf_counter() - started, None
+
+        latencies, statuses, _, elapsed = await _drive(jobs, concurrency, send)
+
+    return summarize(latencies, statuses, elapsed, endpoint="/upload", concurrency=concurrency,
+                     distinct_files=len(payloads), background=background)
+
+
+_FOLLOW_UPS = ["Can you explain that in more detail?", "What about its main drawback?",
+               "How does this compare to the previous answer?", "Give me an example of it."]
+
+
+async def bench_conversation(app=None, base_url: str = None, turns: int = 50, llm=None, seed: int = 0) -> dict:
+    """
+    One session, `turns` sequential questions (every other one a follow-up).
+    Prompt size and latency should stay flat as the conversation grows; with the
+    in-process fake LLM, prompt sizes are read straight from what it received.
+    """
+    questions = [q for _, q in generate_questions(turns, mix={"llm": 0.7, "grammar": 0.3}, seed=seed)]
+    questions = [_FOLLOW_UPS[i % len(_FOLLOW_UPS)] if i % 2 else q for i, q in enumerate(questions)]
+    session_id = f"bench-conversation-{seed}"
+    latencies, prompt_tokens = [], []
+
+    async with _client(app, base_url) as client:
+        for question in questions:
+            seen = len(llm.prompt_chars) if llm is not None else 0
+            started = time.perf_counter()
+            response = await client.post("/ask", json={"question": question, "session_id": session_id})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                return {"failed_at_turn": len(latencies), "status": response.status_code}
+            if llm is not None and len(llm.prompt_chars) > seen:
+                prompt_tokens.append(llm.prompt_chars[-1] // 4)
+
+    window = max(1, turns // 5)
+    first, last = np.asarray(latencies[:window]) * 1000, np.asarray(latencies[-window:]) * 1000
+    result = {
+        "turns": turns,
+        "first_turns_p50_ms": round(float(np.percentile(first, 50)), 2),
+        "last_turns_p50_ms": round(float(np.percentile(last, 50)), 2),
+    }
+    if prompt_tokens:
+        result.update({
+            "prompt_tokens_first": prompt_tokens[0],
+            "prompt_tokens_last": prompt_tokens[-1],
+            "prompt_tokens_max": max(prompt_tokens),
+            "prompt_tokens_by_turn": prompt_tokens,
+            "summary_calls": llm.summary_calls,
+        })
+    return result
+
+
+async def scrape_metrics(app=None, base_url: str = None) -> dict:
+    # Server-side view of the same run: cache hit-rates from /cache/stats
+    async with _client(app, base_url) as client:
+        response = await client.get("/cache/stats")
+        return json.loads(response.text) if response.status_code == 200 else {}
@@ -0,0 +1,193 @@
+import statistics
+import time
+
+from benchmarks.corpus import generate_questions, synthetic_text
+
+
+def timeit(fn, items: list, repeat: int = 5, min_seconds: float = 0.2) -> dict:
+    """
+    Calls fn(item) over `items` in rounds until each round has run for at least
+    `min_seconds`, `repeat` rounds in total. Reports per-call microseconds.
+    """
+    per_call = []
+    calls = 0
+    for _ in range(repeat):
+        started, count = time.perf_counter(), 0
+        while True:
+            for item in items:
+                fn(item)
+            count += len(items)
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_seconds:
+                break
+        per_call.append(elapsed / count * 1e6)
+        calls += count
+    return {
+        "calls": calls,
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "max_us": round(max(per_call), 3),
+    }
+
+
+def _guarded(fn):
+    # Evaluators pull in models / NLTK data that may be missing here → report "skipped", keep going
+    try:
+        return fn()
+    except Exception as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+
+def bench_routing(questions: int = 200, repeat: int = 5) -> dict:
+    from Pipeline.rag_chain import rag_chain
+    from Pipeline.session_store import Session
+
+    corpus = [q for _, q in generate_questions(questions, seed=1)]
+    session = Session("bench-routing")
+    session.pdf_context = "loaded"  # route() only checks that a document is present
+    return {
+        "is_pdf_related": timeit(rag_chain.is_pdf_related, corpus, repeat),
+        "is_grammar_or_intro_query": timeit(rag_chain.is_grammar_or_intro_query, corpus, repeat),
+        "should_use_serpapi": timeit(rag_chain.should_use_serpapi, corpus, repeat),
+        "route": timeit(lambda q: rag_chain.route(q, session), corpus, repeat),
+    }
+
+
+def bench_knowledge_base(questions: int = 100, repeat: int = 5) -> dict:
+    """
+    Index over knowledgeBase/ in a throwaway index directory: cold build
+    (chunk + embed), reload from disk (no model calls), then fused search.
+    """
+    import tempfile
+
+    from Pipeline.knowledge_base import KnowledgeBase
+
+    corpus = [q for _, q in generate_questions(questions, seed=4)]
+    with tempfile.TemporaryDirectory(prefix="flashquery_bench_kb_") as index_dir:
+        started = time.perf_counter()
+        KnowledgeBase(index_dir=index_dir).load()
+        cold = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        kb = KnowledgeBase(index_dir=index_dir)
+        kb.load()
+        warm = (time.perf_counter() - started) * 1000
+        return {
+            "chunks": len(kb),
+            "cold_build_ms": round(cold, 2),
+            "load_from_disk_ms": round(warm, 2),
+            "search": timeit(kb.search, corpus, repeat),
+        }
+
+
+def bench_clean_serp_output(repeat: int = 5) -> dict:
+    from benchmarks.fakes import serp_snippets
+    from Pipeline.rag_chain import rag_chain
+
+    questions = [q for _, q in generate_questions(50, mix={"web": 1.0}, seed=2)]
+    items = [(serp_snippets(q), q) for q in questions]
+    long_items = [(s * 20, q) for s, q in items]  # many results / long snippets
+    return {
+        "short": timeit(lambda item: rag_chain.clean_serp_output(*item), items, repeat),
+        "long": timeit(lambda item: rag_chain.clean_serp_output(*item), long_items, repeat),
+    }
+
+
+def bench_pdf(corpus: dict, repeat: int = 3) -> dict:
+    """
+    Runs extract_page_batch in-process (no pool) so the numbers are pure
+    pdfplumber / Tesseract cost per page. OCR is always cold (no ocr_dir).
+    """
+    from Pipeline.pdf_extractor import count_pages, extract_page_batch
+
+    results = {}
+    for kind in ("text", "scanned"):
+        paths = corpus.get(kind) or []
+        if not paths:
+            results[kind] = {"skipped": "no PDFs of this kind in the corpus"}
+            continue
+        pages = [(path, n) for path in paths for n in range(count_pages(path))]
+
+        def extract(item):
+            path, number = item
+            return extract_page_batch(path, [number], ocr_dir=None)
+
+        results[kind] = _guarded(lambda: {"pages": len(pages), **timeit(extract, pages, repeat, min_seconds=0.0)})
+    return results
+
+
+def bench_evaluators(pairs: int = 50, repeat: int = 3) -> dict:
+    """
+    One entry per evaluator module in knowledgeBase/Evaluators. Embedding-based
+    checks share the embedding cache, so the first round pays the model cost
+    and the rest measure cached lookups; `cold_first_call_ms` records the former.
+    """
+    texts = synthetic_text(pairs, seed=3).split("\n\n")
+    questions = [q for _, q in generate_questions(pairs, seed=3)]
+    rows = [(q, t, t[: len(t) // 2]) for q, t in zip(questions, texts)]  # prompt, response, reference
+    results = {}
+
+    def prompt_evaluator():
+        from knowledgeBase.Evaluators.prompt_evaluator import PromptEvaluator
+
+        evaluator = PromptEvaluator()
+        return timeit(lambda r: evaluator.evaluate_prompt(r[1], r[0], log=False), rows, repeat)
+
+    def hybrid_evaluator():
+        from knowledgeBase.Evaluators.Hybrid_evaluation import HybridEvaluator
+        from knowledgeBase.Evaluators.prompt_evaluator import PromptEvaluator
+
+        evaluator = HybridEvaluator(PromptEvaluator(), {q: ref for q, _, ref in rows})
+        evaluator.log_flagged_result = lambda *args: None  # flagged rows are expected here
+        started = time.perf_counter()
+        evaluator.hybrid_score(rows[0][1], rows[0][0])
+        cold = (time.perf_counter() - started) * 1000
+        single = timeit(lambda r: evaluator.hybrid_score(r[1], r[0]), rows, repeat)
+        dataset = [{"prompt": q, "response": t, "reference": ref} for q, t, ref in rows] * 20
+        started = time.perf_counter()
+        evaluator.score_dataset(dataset, workers=1)
+        batch_us = (time.perf_counter() - started) / len(dataset) * 1e6
+        return {"cold_first_call_ms": round(cold, 2), "hybrid_score": single,
+                "score_dataset_per_row_us": round(batch_us, 3)}
+
+    def knowledge_gap():
+        from knowledgeBase.Evaluators.Knowledge_gapd import knowledge_gap_detection
+
+        return timeit(lambda r: knowledge_gap_detection(r[1], r[2]), rows, repeat)
+
+    def hallucination():
+        from knowledgeBase.Evaluators.hallucination_check import hallucination_score
+
+        return timeit(lambda r: hallucination_score(r[1], r[2]), rows, repeat)
+
+    def toxicity():
+        from knowledgeBase.Evaluators.toxicity_filter import check_toxicity, check_toxicity_batch
+
+        started = time.perf_counter()
+        check_toxicity(rows[0][1])
+        cold = (time.perf_counter() - started) * 1000
+        texts = [r[1] for r in rows]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            check_toxicity_batch(texts)
+        batch_us = (time.perf_counter() - started) / (repeat * len(texts)) * 1e6
+        return {
+            "cold_first_call_ms": round(cold, 2),
+            "check_toxicity": timeit(lambda r: check_toxicity(r[1]), rows[:10], repeat, min_seconds=0.0),
+            "check_toxicity_batch_per_text_us": round(batch_us, 3),
+        }
+
+    for name, fn in (("prompt_evaluator", prompt_evaluator), ("hybrid_evaluation", hybrid_evaluator),
+                     ("knowledge_gapd", knowledge_gap), ("hallucination_check", hallucination),
+                     ("toxicity_filter", toxicity)):
+        results[name] = _guarded(fn)
+    return results
+
+
+def run_micro(corpus: dict, repeat: int = 5) -> dict:
+    return {
+        "routing": _guarded(lambda: bench_routing(repeat=repeat)),
+        "knowledge_base": _guarded(lambda: bench_knowledge_base(repeat=repeat)),
+        "clean_serp_output": _guarded(lambda: bench_clean_serp_output(repeat=repeat)),
+        "pdf": _guarded(lambda: bench_pdf(corpus, repeat=max(1, repeat // 2))),
+        "evaluators": bench_evaluators(repeat=max(1, repeat // 2)),
+    }
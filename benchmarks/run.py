@@ -0,0 +1,176 @@
+"""
+FlashQuery benchmark suite → one JSON file per run, comparable across commits.
+
+    python -m benchmarks.run                          # micro + load, fakes for Groq / SerpAPI
+    python -m benchmarks.run --suite micro
+    python -m benchmarks.run --suite load --concurrency 32 --requests 500 --llm-latency-ms 800
+    python -m benchmarks.run --suite load --web-mode sequential --search-latency-ms 2000 --search-empty-rate 0.3
+    python -m benchmarks.run --baseline benchmarks/results/<old commit>.json
+
+Load tests run in-process over ASGI by default (no sockets), with FakeChatGroq /
+FakeSerpAPI installed, so no API quota is used and network noise stays out of
+the numbers. `--base-url` points the load tests at a running server instead
+(that server decides which upstreams it talks to); stream time-to-first-token
+is only measured there, since the in-process transport buffers whole responses.
+In-process runs keep the content cache, KB index and sessions in the run's temp
+dir, so results don't depend on what an earlier run left on disk.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.compare import compare, print_comparison
+from benchmarks.corpus import build_corpus
+from benchmarks.load import bench_ask, bench_conversation, bench_upload, prepare_sessions, scrape_metrics
+from benchmarks.micro import run_micro
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# On-disk state the app would otherwise share with earlier runs (and a dev server) via the system temp dir
+STATE_DIRS = ("CONTENT_CACHE_DIR", "KB_INDEX_DIR", "SESSION_DIR")
+
+
+def _git(*args) -> str | None:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+async def run_load(args, corpus: dict) -> dict:
+    app, llm = None, None
+    if not args.base_url:
+        from benchmarks.fakes import FakeChatGroq, FakeSerpAPI, install
+        from main import app
+        from Pipeline.rag_chain import rag_chain
+
+        llm, _ = install(
+            FakeChatGroq(args.llm_latency_ms, args.llm_jitter_ms, args.llm_tokens, args.token_ms,
+                         args.llm_fail_rate, seed=args.seed),
+            FakeSerpAPI(args.search_latency_ms, args.search_jitter_ms, args.search_fail_rate,
+                        args.search_empty_rate, seed=args.seed),
+        )
+        if args.no_answer_cache:
+            rag_chain.answer_cache.enabled = False
+        if args.web_mode:
+            rag_chain.web_mode = args.web_mode
+        if args.hedge_delay_ms is not None:
+            rag_chain.hedge_delay = args.hedge_delay_ms / 1000
+        await prepare_sessions(args.sessions)
+
+    common = dict(app=app, base_url=args.base_url)
+    results = {
+        "ask": await bench_ask(requests=args.requests, concurrency=args.concurrency, sessions=args.sessions,
+                               repeat_ratio=args.repeat_ratio, seed=args.seed, **common),
+        "ask_stream": await bench_ask(requests=args.requests, concurrency=args.concurrency,
+                                      sessions=args.sessions, repeat_ratio=args.repeat_ratio,
+                                      stream=True, seed=args.seed + 1, **common),
+    }
+    if args.conversation_turns:
+        results["conversation"] = await bench_conversation(turns=args.conversation_turns, llm=llm,
+                                                           seed=args.seed, **common)
+    pdfs = corpus["text"] + corpus["scanned"]
+    if pdfs and args.upload_requests:
+        results["upload"] = await bench_upload(pdfs, requests=args.upload_requests,
+                                               concurrency=args.upload_concurrency, **common)
+    results["server_cache_stats"] = await scrape_metrics(**common)
+    return results
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="FlashQuery load + micro benchmarks")
+    parser.add_argument("--suite", choices=("all", "micro", "load"), default="all")
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="micro-benchmark rounds")
+    parser.add_argument("--log-level", default="ERROR", help="app log level while benchmarking")
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--sessions", type=int, default=4)
+    load.add_argument("--repeat-ratio", type=float, default=0.2, help="share of questions from a hot set")
+    load.add_argument("--no-answer-cache", action="store_true")
+    load.add_argument("--web-mode", choices=("hedged", "sequential"), help="web-route execution (default: config)")
+    load.add_argument("--hedge-delay-ms", type=float, help="delay before the LLM branch joins a hedged web route")
+    load.add_argument("--conversation-turns", type=int, default=50, help="0 skips the multi-turn scenario")
+    load.add_argument("--upload-requests", type=int, default=12)
+    load.add_argument("--upload-concurrency", type=int, default=2)
+
+    fakes = parser.add_argument_group("upstream fakes")
+    fakes.add_argument("--llm-latency-ms", type=float, default=300)
+    fakes.add_argument("--llm-jitter-ms", type=float, default=50)
+    fakes.add_argument("--llm-tokens", type=int, default=40)
+    fakes.add_argument("--token-ms", type=float, default=10)
+    fakes.add_argument("--llm-fail-rate", type=float, default=0.0)
+    fakes.add_argument("--search-latency-ms", type=float, default=150)
+    fakes.add_argument("--search-jitter-ms", type=float, default=30)
+    fakes.add_argument("--search-fail-rate", type=float, default=0.0)
+    fakes.add_argument("--search-empty-rate", type=float, default=0.0)
+
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--text-pdfs", type=int, default=4)
+    corpus.add_argument("--text-pages", type=int, default=5)
+    corpus.add_argument("--scanned-pdfs", type=int, default=2)
+    corpus.add_argument("--scanned-pages", type=int, default=2)
+    return parser
+
+
+def main(argv=None) -> dict:
+    args = _parser().parse_args(argv)
+    report = {"environment": _environment(), "params": vars(args)}
+    with tempfile.TemporaryDirectory(prefix="flashquery_bench_") as directory:
+        # Config is read at import, so every app module is imported only after this point → each run
+        # starts from empty caches / indexes / sessions instead of whatever the last run left behind
+        for name in STATE_DIRS:
+            os.environ[name] = os.path.join(directory, name.lower())
+        import Backend.core.logger  # noqa: F401  configures the "flashquery" logger before --log-level overrides it
+        logging.getLogger("flashquery").setLevel(args.log_level.upper())
+
+        corpus = build_corpus(directory, args.text_pdfs, args.text_pages, args.scanned_pdfs,
+                              args.scanned_pages, seed=args.seed)
+        report["corpus"] = {k: len(v) if k != "skipped" else v for k, v in corpus.items()}
+        if args.suite in ("all", "micro"):
+            report["micro"] = run_micro(corpus, repeat=args.repeat)
+        if args.suite in ("all", "load"):
+            report["load"] = asyncio.run(run_load(args, corpus))
+
+    if not args.base_url:
+        from Pipeline.pdf_extractor import pdf_extractor
+        pdf_extractor.shutdown()
+
+    commit = (report["environment"]["commit"] or "nogit")[:12]
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if report['environment']['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results → {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            print_comparison(compare(json.load(f), report))
+    return report
+
+
+if __name__ == "__main__":
+    main()
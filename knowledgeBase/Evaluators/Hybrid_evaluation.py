@@ -1,9 +1,19 @@
 import re
-import torch
-from sentence_transformers import SentenceTransformer, util
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import numpy as np
+from Backend.core.logger import get_logger, log_event
+from knowledgeBase.Evaluators.embedding_service import embedding_service
 from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
 from rouge_score import rouge_scorer
 
+logger = get_logger("evaluators.hybrid")
+
+SCORE_KEYS = ("semantic_score", "bleu_score", "rouge_score", "f1_score", "hybrid_score")
+
 # Reuse your simple tokenizer:
 def simple_tokenizer(text):
     text = re.sub(r'\W+', ' ', text.lower())
@@ -13,18 +23,17 @@ def simple_tokenizer(text):
 class HybridEvaluator:
     def __init__(self, prompt_evaluator, reference_dict=None):
         self.prompt_evaluator = prompt_evaluator  # pass PromptEvaluator instance
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.embeddings = embedding_service  # shared, lazily loaded model + embedding cache
         self.reference_dict = reference_dict or {}
         self.rouge = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True) 
+        self._reference_vectors = None  # prompt → reference embedding, filled by precompute_references()
 
     # Semantic Similarity
     def semantic_similarity(self, response, prompt):
         reference = self.reference_dict.get(prompt)
         if not reference:
             return None
-        ref_embed = self.embedding_model.encode(reference, convert_to_tensor=True)
-        res_embed = self.embedding_model.encode(response, convert_to_tensor=True)
-        return float(util.pytorch_cos_sim(ref_embed, res_embed).item())
+        return self.embeddings.similarity(reference, response)
 
 #---------------------------------------------------------------------------
     # BLEU Score - to check how closely generated response is to reference ( ground-truth answer) in vector store
@@ -108,16 +117,183 @@ class HybridEvaluator:
         return result
 
     def log_flagged_result(self, prompt, result):
-        print("\n🚨 HYBRID EVAL FLAGGED 🚨")
-        print(f"Prompt: {prompt}")
-        print(f"Generated Response: {result['response']}")
-        print("----- Prompt Evaluation -----")
-        print(f"Rule Check: {result['prompt_eval']['rule_check']}")
-        print(f"Adherence Check: {result['prompt_eval']['adherence_check']}")
-        print(f"Quality Check: {result['prompt_eval']['quality_check']}")
-        print("----- Semantic / Lexical -----")
-        print(f"Semantic Score: {result['semantic_score']}")
-        print(f"BLEU Score: {result['bleu_score']}")
-        print(f"ROUGE Score: {result['rouge_score']}")
-        print(f"F1 Score: {result['f1_score']}")
-        print(f"Hybrid Score: {result['hybrid_score']}")
\ No newline at end of file
+        prompt_eval = result["prompt_eval"]
+        log_event(logger, logging.WARNING, "hybrid_eval_flagged", prompt_chars=len(prompt),
+                  rule_check=prompt_eval["rule_check"], adherence_check=prompt_eval["adherence_check"],
+                  quality_check=prompt_eval["quality_check"], semantic_score=result["semantic_score"],
+                  bleu_score=result["bleu_score"], rouge_score=result["rouge_score"],
+                  f1_score=result["f1_score"], hybrid_score=result["hybrid_score"])
+        log_event(logger, logging.DEBUG, "hybrid_eval_flagged_text", prompt=prompt, response=result["response"])
+
+#---------------------------------------------------------------------------
+    # Batch evaluation → score a whole dataset (JSONL file or iterable of dicts)
+
+    def precompute_references(self):
+        # Encode every reference answer once; reused by every score_dataset() batch
+        if self._reference_vectors is None:
+            prompts = [p for p, ref in self.reference_dict.items() if ref]
+            vectors = self.embeddings.encode([self.reference_dict[p] for p in prompts]) if prompts else []
+            self._reference_vectors = dict(zip(prompts, vectors))
+        return self._reference_vectors
+
+    def score_dataset(self, dataset, output_path=None, score_threshold=0.6, batch_size=1024, workers=None, max_flagged=100):
+        """
+        Scores many (prompt, response, reference) rows at once.
+
+        dataset: path to a JSONL file or an iterable of dicts with "prompt", "response"
+                 and optional "reference" (falls back to reference_dict[prompt]).
+        output_path: if given, one JSON result per line is streamed there and the
+                     report is written next to it as <output_path>.summary.json.
+
+        Returns:
+            dict report with row / flagged counts, per-metric aggregates and the
+            first `max_flagged` flagged rows (instead of printing each one).
+        """
+        self.precompute_references()
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        out = open(output_path, "w", encoding="utf-8") if output_path else None
+
+        scores = {key: [] for key in SCORE_KEYS}
+        flagged, flagged_count, rows = [], 0, 0
+        try:
+            rows_iter = iter(_read_rows(dataset))
+            batches = iter(lambda: list(islice(rows_iter, batch_size)), [])
+            for batch in batches:
+                for result in self._score_batch(batch, score_threshold, pool, workers):
+                    rows += 1
+                    for key in SCORE_KEYS:
+                        scores[key].append(result[key])
+                    if result["flagged"]:
+                        flagged_count += 1
+                        if len(flagged) < max_flagged:
+                            flagged.append({
+                                "prompt": result["prompt"],
+                                "hybrid_score": result["hybrid_score"],
+                                "reasons": _flag_reasons(result, score_threshold),
+                            })
+                    if out:
+                        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        finally:
+            if out:
+                out.close()
+            if pool:
+                pool.shutdown()
+
+        report = {
+            "rows": rows,
+            "flagged": flagged_count,
+            "flagged_rate": round(flagged_count / rows, 4) if rows else 0.0,
+            "score_threshold": score_threshold,
+            "scores": {key: _aggregate(values) for key, values in scores.items()},
+            "flagged_examples": flagged,
+        }
+        if output_path:
+            with open(f"{output_path}.summary.json", "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+    def score_batch(self, rows, score_threshold=0.6):
+        """
+        Per-row results for a small in-memory batch of dicts with "prompt",
+        "response" and optional "reference": one encode call, no process
+        pool, no flagged-row logging (online evaluation logs its own way).
+        """
+        self.precompute_references()
+        return self._score_batch(list(rows), score_threshold, None, 1)
+
+    def _score_batch(self, batch, score_threshold, pool, workers):
+        prompts = [row.get("prompt", "") for row in batch]
+        responses = [row.get("response", "") for row in batch]
+        references = [row.get("reference") or self.reference_dict.get(p, "") for row, p in zip(batch, prompts)]
+
+        # Semantic → one encode for all responses (+ unseen references), then row-wise cosine
+        semantic = np.zeros(len(batch), dtype="float32")
+        idx = [i for i, ref in enumerate(references) if ref]
+        if idx:
+            known = self._reference_vectors
+            ref_vectors = [known.get(prompts[i]) if references[i] == self.reference_dict.get(prompts[i]) else None for i in idx]
+            unseen = [references[i] for i, vec in zip(idx, ref_vectors) if vec is None]
+            encoded = self.embeddings.encode([responses[i] for i in idx] + unseen)
+            res_matrix, unseen_vectors = encoded[:len(idx)], iter(encoded[len(idx):])
+            ref_matrix = np.stack([vec if vec is not None else next(unseen_vectors) for vec in ref_vectors])
+            semantic[idx] = np.einsum("ij,ij->i", ref_matrix, res_matrix)
+
+        # Lexical → pure Python, so spread over processes
+        pairs = list(zip(responses, references))
+        if pool:
+            lexical = list(pool.map(_lexical_scores, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+        else:
+            lexical = [_lexical_scores(pair) for pair in pairs]
+
+        results = []
+        for i, (bleu, rouge, f1) in enumerate(lexical):
+            prompt_eval = (
+                self.prompt_evaluator.evaluate_prompt(responses[i], prompts[i], log=False)
+                if self.prompt_evaluator else {"flagged": False}
+            )
+            semantic_score = float(semantic[i])
+            final_score = (semantic_score + bleu + rouge + f1) / 4.0
+            results.append({
+                "prompt": prompts[i],
+                "response": responses[i],
+                "semantic_score": semantic_score,
+                "bleu_score": bleu,
+                "rouge_score": rouge,
+                "f1_score": f1,
+                "hybrid_score": final_score,
+                "prompt_eval": prompt_eval,
+                "flagged": prompt_eval["flagged"] or final_score < score_threshold,
+            })
+        return results
+
+
+#---------------------------------------------------------------------------
+# Helpers for score_dataset (module level so process-pool workers can pickle them)
+
+_worker_evaluator = None
+
+def _lexical_scores(pair):
+    global _worker_evaluator
+    response, reference = pair
+    if not reference:
+        return 0.0, 0.0, 0.0
+    if _worker_evaluator is None:
+        _worker_evaluator = HybridEvaluator(prompt_evaluator=None)
+    ev = _worker_evaluator
+    return ev.bleu_score(response, reference), ev.rouge_score(response, reference), ev.f1_score(response, reference)
+
+def _read_rows(dataset):
+    if isinstance(dataset, (str, os.PathLike)):
+        with open(dataset, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from dataset
+
+def _aggregate(values):
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype="float64")
+    return {
+        "mean": round(float(arr.mean()), 4),
+        "p10": round(float(np.percentile(arr, 10)), 4),
+        "p50": round(float(np.percentile(arr, 50)), 4),
+        "min": round(float(arr.min()), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+def _flag_reasons(result, score_threshold):
+    reasons = []
+    if result["hybrid_score"] < score_threshold:
+        reasons.append("low_hybrid_score")
+    prompt_eval = result["prompt_eval"]
+    if "rule_check" in prompt_eval:
+        if not all(prompt_eval["rule_check"].values()):
+            reasons.append("rule_check")
+        if not prompt_eval["adherence_check"]:
+            reasons.append("adherence_check")
+        if not prompt_eval["quality_check"]:
+            reasons.append("quality_check")
+    return reasons
@@ -1,9 +1,6 @@
 # knowledgeGapD.py
 
-from sentence_transformers import SentenceTransformer, util
-
-# Load embedding model once globally for efficiency
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+from knowledgeBase.Evaluators.embedding_service import embedding_service
 
 def knowledge_gap_detection(response: str, reference_answer: str):
     """
@@ -13,10 +10,8 @@ def knowledge_gap_detection(response: str, reference_answer: str):
     Returns:
         (bool, float): Pass/Fail flag and similarity score
     """
-    response_embedding = embedding_model.encode(response, convert_to_tensor=True)
-    reference_embedding = embedding_model.encode(reference_answer, convert_to_tensor=True)
-    
-    similarity = util.pytorch_cos_sim(response_embedding, reference_embedding).item()
+    # One batched encode for both texts; the reference is cached after the first call
+    similarity = embedding_service.similarity(response, reference_answer)
     return similarity >= 0.8, similarity  # threshold can be adjusted
 
 
@@ -27,7 +22,4 @@ def embedding_similarity_check(generated_response: str, retrieved_context: str):
     Returns:
         float: cosine similarity score (0.0 to 1.0)
     """
-    gen_embedding = embedding_model.encode(generated_response, convert_to_tensor=True)
-    ctx_embedding = embedding_model.encode(retrieved_context, convert_to_tensor=True)
-
-    return util.pytorch_cos_sim(gen_embedding, ctx_embedding).item()
\ No newline at end of file
+    return embedding_service.similarity(generated_response, retrieved_context)
\ No newline at end of file
@@ -0,0 +1,129 @@
+# embedding_service.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from Backend.core.config import (
+    EMBEDDING_MODEL_NAME,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_WAIT_MS,
+    EMBED_CACHE_SIZE,
+)
+from knowledgeBase.Evaluators.micro_batcher import MicroBatcher
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingService:
+    """
+    One SentenceTransformer per process, shared by the evaluators and the RAG pipeline.
+
+    - The model is loaded on first use, not at import.
+    - Concurrent callers are micro-batched: requests queue up for at most
+      `max_wait_ms` (or until `max_batch_size` texts) and go through one encode() call.
+    - Embeddings are kept in an LRU keyed by text hash, so reference answers
+      and repeated prompts are encoded once.
+
+    Vectors are L2-normalised float32, so cosine similarity is a plain dot product.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, max_batch_size: int = EMBED_BATCH_SIZE,
+                 max_wait_ms: float = EMBED_MAX_WAIT_MS, cache_size: int = EMBED_CACHE_SIZE):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._batcher = MicroBatcher(self._encode_now, max_batch_size, max_wait_ms, name="embedding-batcher")
+        self._local = threading.local()
+
+    # ---------------------------------------------------------------
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _encode_now(self, texts: list[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.max_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype="float32")
+
+    @contextmanager
+    def unbatched(self):
+        """
+        Encodes from this thread skip the serving micro-batcher and run on the
+        thread itself → background work (online evaluation) never queues in
+        front of /ask requests. The model and the LRU are still shared.
+        """
+        previous = getattr(self._local, "unbatched", False)
+        self._local.unbatched = True
+        try:
+            yield
+        finally:
+            self._local.unbatched = previous
+
+    # ---------------------------------------------------------------
+    def encode(self, texts) -> np.ndarray:
+        """
+        Accepts one string or a list of strings.
+        Returns a (dim,) vector for a string, (n, dim) matrix for a list.
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        keys = [_text_key(t) for t in texts]
+
+        found = {}
+        with self._cache_lock:
+            for key in keys:
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = vector
+
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        if missing:
+            if getattr(self._local, "unbatched", False):
+                vectors = self._encode_now(missing)
+            else:
+                vectors = self._batcher.submit(missing)
+            with self._cache_lock:
+                for text, vector in zip(missing, vectors):
+                    key = _text_key(text)
+                    found[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        matrix = np.stack([found[k] for k in keys])
+        return matrix[0] if single else matrix
+
+    def similarity(self, a: str, b: str) -> float:
+        vectors = self.encode([a, b])
+        return float(vectors[0] @ vectors[1])
+
+
+# Shared instance → import this instead of building a SentenceTransformer
+embedding_service = EmbeddingService()
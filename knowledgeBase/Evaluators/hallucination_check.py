@@ -1,9 +1,6 @@
 # hallucination_check.py
 
-from sentence_transformers import SentenceTransformer, util
-
-# Load the embedding model (once per module)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from knowledgeBase.Evaluators.embedding_service import embedding_service
 
 def hallucination_score(response: str, reference: str) -> float:
     """
@@ -14,8 +11,5 @@ def hallucination_score(response: str, reference: str) -> float:
     if not response.strip() or not reference.strip():
         return 0.0  # Avoid division by zero or empty inputs
 
-    response_embedding = model.encode(response, convert_to_tensor=True)
-    reference_embedding = model.encode(reference, convert_to_tensor=True)
-
-    similarity = util.pytorch_cos_sim(response_embedding, reference_embedding).item()
+    similarity = embedding_service.similarity(response, reference)
     return round(similarity, 3)
\ No newline at end of file
@@ -0,0 +1,76 @@
+# micro_batcher.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Groups items from concurrent callers into one model call.
+
+    Callers block in submit(); a daemon thread collects queued requests until
+    `max_batch_size` items are pending or `max_wait_ms` has passed since the
+    first one, runs `batch_fn(items) -> results` once, and hands each caller
+    its slice of the results (same order as submitted).
+
+    Submissions larger than `max_batch_size` (a whole PDF's chunks) skip the
+    queue and run `batch_fn` on the caller's thread: queued, they would hold
+    the worker and every small request behind them until they finished.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int, max_wait_ms: float, name: str = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._drain, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            items = [x for pending, _ in batch for x in pending]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for pending, future in batch:
+                future.set_result(results[offset:offset + len(pending)])
+                offset += len(pending)
+
+    def submit(self, items: list):
+        if not items:
+            return []
+        if len(items) > self.max_batch_size:
+            return self.batch_fn(items)
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((items, future))
+        return future.result()
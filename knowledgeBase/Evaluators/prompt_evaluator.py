@@ -1,12 +1,23 @@
+import logging
 import re
 import nltk
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+from Backend.core.logger import get_logger, log_event
+
+logger = get_logger("evaluators.prompt")
 
 # Simple tokenizer
 def simple_tokenizer(text):
     text = re.sub(r'\W+', ' ', text.lower())
     return text.split()
 
+# NLTK reads the stopword list from disk on every words() call → load it once per process
+@lru_cache(maxsize=1)
+def english_stopwords():
+    return frozenset(nltk.corpus.stopwords.words('english'))
+
 class PromptEvaluator:
     def __init__(self, reference_dict=None):
         self.reference_dict = reference_dict or {}
@@ -46,7 +57,7 @@ class PromptEvaluator:
         words = simple_tokenizer(prompt)
         if len(words) < 5:
             return False  # Too short → bad prompt
-        stopwords = set(nltk.corpus.stopwords.words('english'))
+        stopwords = english_stopwords()
         stopword_ratio = len([w for w in words if w in stopwords]) / len(words)
         if stopword_ratio > 0.6:
             return False  # Too many stopwords → bad prompt
@@ -79,13 +90,15 @@ class PromptEvaluator:
 
 
     # Final prompt evaluation → pass/fail + all checks
-    def evaluate_prompt(self, response, prompt):
+    def evaluate_prompt(self, response, prompt, log=True):
         rule_check = self.rule_based_eval(response, prompt)
         adherence_check = self.prompt_adherence_check(response, prompt)
         quality_check = self.prompt_quality_check(prompt)
 
-        # DEBUG PRINT — this helps you trace WHY Quality Check is False even when other checks look True
-        print(f"\n[DEBUG] Rule Check = {rule_check}, Adherence Check = {adherence_check}, Quality Check = {quality_check}")
+        # DEBUG log — this helps you trace WHY Quality Check is False even when other checks look True
+        if log:
+            log_event(logger, logging.DEBUG, "prompt_eval_checks", rule_check=rule_check,
+                      adherence_check=adherence_check, quality_check=quality_check)
 
         flag = not all(rule_check.values()) or not adherence_check or not quality_check
 
@@ -96,15 +109,13 @@ class PromptEvaluator:
             "flagged": flag
         }
 
-        if flag:
+        if flag and log:
             self.log_flagged_prompt(prompt, response, result)
 
         return result
 
     def log_flagged_prompt(self, prompt, response, result):
-        print("\n🚨 Prompt flagged for review:")
-        print(f"Prompt: {prompt}")
-        print(f"Generated Response: {response}")
-        print(f"Rule Check: {result['rule_check']}")
-        print(f"Adherence Check: {result['adherence_check']}")
-        print(f"Quality Check: {result['quality_check']}")
\ No newline at end of file
+        log_event(logger, logging.WARNING, "prompt_flagged", prompt_chars=len(prompt), response_chars=len(response),
+                  rule_check=result["rule_check"], adherence_check=result["adherence_check"],
+                  quality_check=result["quality_check"])
+        log_event(logger, logging.DEBUG, "prompt_flagged_text", prompt=prompt, response=response)
\ No newline at end of file
@@ -1,21 +1,89 @@
-from transformers import pipeline
+import threading
 
-# Load zero-shot toxicity classifier (will auto-download model on first run)
-classifier = pipeline("text-classification", model="unitary/toxic-bert", top_k=None)
+from Backend.core.config import (
+    TOXICITY_MODEL_NAME,
+    TOXICITY_MAX_BATCH,
+    TOXICITY_MAX_WAIT_MS,
+    TOXICITY_MAX_TOKENS,
+    TOXICITY_MAX_CHUNKS,
+)
+from knowledgeBase.Evaluators.micro_batcher import MicroBatcher
 
-def check_toxicity(text):
+# Zero-shot toxicity classifier → loaded on first use (will auto-download model on first run)
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from transformers import pipeline
+                _classifier = pipeline("text-classification", model=TOXICITY_MODEL_NAME, top_k=None)
+    return _classifier
+
+
+def split_for_model(text, max_tokens=TOXICITY_MAX_TOKENS, max_chunks=TOXICITY_MAX_CHUNKS):
+    """
+    Splits text into windows that fit the model (toxic-bert reads 512 tokens).
+    Anything past `max_chunks` windows is dropped, so cost per text is bounded.
+    """
+    tokenizer = get_classifier().tokenizer
+    window = max_tokens - 2  # room for [CLS] / [SEP]
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    if len(ids) <= window:
+        return [text]
+    return [
+        tokenizer.decode(ids[start:start + window])
+        for start in range(0, min(len(ids), window * max_chunks), window)
+    ]
+
+
+def _toxic_scores(texts):
+    # One forward pass per micro-batch (oversized direct submissions go TOXICITY_MAX_BATCH at a time);
+    # truncation guards against any window that re-tokenizes longer
+    outputs = get_classifier()(texts, batch_size=min(len(texts), TOXICITY_MAX_BATCH), truncation=True,
+                               max_length=TOXICITY_MAX_TOKENS)
+    scores = []
+    for result in outputs:
+        toxic_score = 0.0
+        for label in result:
+            if label["label"] == "toxic":
+                toxic_score = label["score"]
+                break
+        scores.append(toxic_score)
+    return scores
+
+
+_batcher = MicroBatcher(_toxic_scores, TOXICITY_MAX_BATCH, TOXICITY_MAX_WAIT_MS, name="toxicity-batcher")
+
+
+def check_toxicity_batch(texts):
     """
+    Scores several texts in as few forward passes as possible.
+    Long texts are chunked; a text's score is the max over its chunks.
+
     Returns:
-        flagged (bool): True if text is toxic
-        score (float): Toxicity score (0.0 - 1.0)
+        list of (flagged, score) tuples in input order
     """
-    result = classifier(text)[0]
-    toxic_score = 0.0
+    chunks, owners = [], []
+    for i, text in enumerate(texts):
+        for chunk in split_for_model(text) if text.strip() else []:
+            chunks.append(chunk)
+            owners.append(i)
 
-    for label in result:
-        if label["label"] == "toxic":
-            toxic_score = label["score"]
-            break
+    best = [0.0] * len(texts)
+    for owner, score in zip(owners, _batcher.submit(chunks)):
+        best[owner] = max(best[owner], score)
 
     # Flag if toxic score is above threshold
-    return toxic_score > 0.5, round(toxic_score, 3)
\ No newline at end of file
+    return [(score > 0.5, round(score, 3)) for score in best]
+
+
+def check_toxicity(text):
+    """
+    Returns:
+        flagged (bool): True if text is toxic
+        score (float): Toxicity score (0.0 - 1.0)
+    """
+    return check_toxicity_batch([text])[0]
\ No newline at end of file
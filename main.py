@@ -1,14 +1,86 @@
-from fastapi import FastAPI, UploadFile, File
+import time
+_IMPORT_STARTED = time.perf_counter()  # ✅ import-time budget starts here
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from langchain_groq import ChatGroq
-from Pipeline.rag_chain import rag_chain
-from PIL import Image
-import pytesseract
-import pdfplumber
-import io
+from python_multipart import MultipartParser
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import parse_options_header
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from Backend.core.config import WARMUP_COMPONENTS, READY_REQUIRES, UPLOAD_CHUNK_BYTES, MAX_UPLOAD_BYTES
+from Backend.core.readiness import readiness
+from Backend.core.logger import get_logger, log_event, elapsed_ms, request_id_var
+from Backend.core.metrics import registry, REQUEST_SECONDS, STAGE_SECONDS
+from Pipeline.rag_chain import rag_chain, get_search, search_ready
+from Pipeline.pdf_extractor import pdf_extractor, extraction_jobs, ingestion_limiter, PageLimitExceeded
+from Pipeline.content_cache import content_cache
+from Pipeline.upstreams import llm_upstream, search_upstream, upstream_states, close_clients
+from Pipeline.session_store import validate_session_id
+from knowledgeBase.Evaluators.embedding_service import embedding_service
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import uuid
+
+# ✅ Heavy components → built lazily on first use, or warmed up in the background after startup
+readiness.register("llm", lambda: rag_chain.chain, lambda: rag_chain.chain_ready)
+readiness.register("search", get_search, search_ready)
+readiness.register("embeddings", lambda: embedding_service.encode("warm-up"), lambda: embedding_service.loaded)
+readiness.register("pdf_pool", pdf_extractor.warm, lambda: pdf_extractor.ready)
+readiness.register("knowledge_base", rag_chain.knowledge_base.load, lambda: rag_chain.knowledge_base.loaded)
+
+logger = get_logger("api")
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+_MULTIPART_OVERHEAD = 64 * 1024  # boundaries + part headers around the PDF itself
+
+# ✅ Gauges read at scrape time
+registry.add_collector(lambda: [
+    ("flashquery_sessions", "Sessions held in memory", len(rag_chain.sessions)),
+    ("flashquery_answer_cache_entries", "Entries in the answer cache", rag_chain.answer_cache.stats()["entries"]),
+    ("flashquery_search_cache_entries", "Entries in the search cache", rag_chain.search_cache.stats()["entries"]),
+    ("flashquery_kb_chunks", "Chunks in the local knowledge-base index", len(rag_chain.knowledge_base)),
+    ("flashquery_eval_queue_depth", "Sampled answers waiting for online evaluation", rag_chain.evaluations.pending),
+])
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+def _upstream_gauges():
+    gauges = []
+    for upstream in (llm_upstream, search_upstream):
+        state, labels = upstream.state(), {"upstream": upstream.name}
+        gauges += [
+            ("flashquery_circuit_state", "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+             _CIRCUIT_STATES[state["circuit"]], labels),
+            ("flashquery_upstream_in_flight", "Upstream calls in flight", state["in_flight"], labels),
+            ("flashquery_retry_budget_tokens", "Retries the upstream's retry budget still allows",
+             state["retry_budget_tokens"], labels),
+        ]
+    return gauges
+
+registry.add_collector(_upstream_gauges)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Warm-up runs after the server starts accepting traffic; /ready reports progress
+    warmup = asyncio.create_task(readiness.warm(WARMUP_COMPONENTS))
+    readiness.record("startup", time.perf_counter() - started)
+    yield
+    if not warmup.done():
+        warmup.cancel()
+    pdf_extractor.shutdown()
+    await asyncio.to_thread(rag_chain.evaluations.shutdown)
+    await close_clients()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # ✅ Root route for Ngrok base URL access
 @app.get("/")
@@ -23,54 +95,308 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ✅ Request id + latency for every request (X-Request-ID is reused if the caller sent a sane one)
+def _request_done(request: Request, request_id: str, started: float, status: int):
+    # Route template, not the raw path → bounded label set (/upload/status/{job_id})
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+    token = request_id_var.set(request_id)  # the body is sent from another task than the one that set it
+    try:
+        log_event(logger, logging.INFO, "request_done", method=request.method, route=route,
+                  status=status, ms=elapsed_ms(started))
+    finally:
+        request_id_var.reset(token)
+
+async def _timed_body(body, request: Request, request_id: str, started: float, status: int):
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        _request_done(request, request_id, started, status)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    incoming = request.headers.get("x-request-id", "")
+    request_id = incoming if _REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        _request_done(request, request_id, started, 500)
+        raise
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    # call_next returns as soon as the headers are ready → stop the clock after the last body chunk
+    # instead, or /ask/stream would only time up to its first token
+    response.body_iterator = _timed_body(response.body_iterator, request, request_id, started, response.status_code)
+    return response
+
 class QueryRequest(BaseModel):
     question: str
     context: str | None = None
+    session_id: str | None = None
+
+def _checked_session_id(session_id: str | None) -> str | None:
+    if session_id is None:
+        return None
+    try:
+        return validate_session_id(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _on_background_extracted(session_id: str, job_id: str, text: str):
+    if text.strip():
+        rag_chain.load_pdf_text(text, session_id)
+
+def _check_upload_length(request: Request):
+    """
+    Rejects on the declared body size before any of it is received: the server
+    never reads past Content-Length, so this bounds receipt and spooling.
+    The exact MAX_UPLOAD_BYTES limit on the PDF itself is applied by _spool_upload.
+    """
+    length = request.headers.get("content-length", "")
+    if not length.isdigit():
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    if int(length) > MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+
+class _FilePart:
+    """
+    python-multipart callbacks that pick the "file" part out of an upload body: its bytes are
+    queued for _spool_upload to write, every other part is skipped without being buffered.
+    """
+
+    def __init__(self):
+        self.pending, self.buffered, self.size = [], 0, 0
+        self.found = self.complete = False
+        self._headers, self._field, self._value, self._active = {}, b"", b"", False
+
+    def callbacks(self) -> dict:
+        return {"on_part_begin": self.on_part_begin, "on_header_field": self.on_header_field,
+                "on_header_value": self.on_header_value, "on_header_end": self.on_header_end,
+                "on_headers_finished": self.on_headers_finished, "on_part_data": self.on_part_data,
+                "on_end": self.on_end}
+
+    def on_part_begin(self):
+        self._headers, self._active = {}, False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") == b"file" and b"filename" in options:
+            if self.found:
+                raise HTTPException(status_code=400, detail="Only one file per upload")
+            self.found = self._active = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            self.pending.append(data[start:end])
+            self.buffered += end - start
+            self.size += end - start
 
-# ✅ Global variable to store extracted PDF content
-pdf_text = ""
+    def take(self) -> bytes:
+        data, self.pending, self.buffered = b"".join(self.pending), [], 0
+        return data
 
-# ✅ PDF Upload Endpoint
-@app.post("/upload")
-async def upload_pdf(file: UploadFile = File(...)):
-    global pdf_text
-    extracted = ""
+    def on_end(self):
+        self.complete = True
+
+async def _spool_upload(request: Request) -> tuple[str, str]:
+    """
+    Parses the multipart body straight off the request stream and writes the "file" part to
+    a temp file in one pass, hashing as it goes, so the PDF is neither held in memory nor
+    spooled twice. Raises 413 past MAX_UPLOAD_BYTES, 400 on a malformed body, 422 without a file.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    part = _FilePart()
+    parser = MultipartParser(options[b"boundary"], part.callbacks())
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        path = tmp.name
+
+        async def flush():
+            data = part.take()
+            digest.update(data)
+            await run_in_threadpool(tmp.write, data)
+
+        try:
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except FormParserError as e:
+                    raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+                if part.size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES} bytes")
+                # The server hands the body over in small receive chunks → write in UPLOAD_CHUNK_BYTES batches
+                if part.buffered >= UPLOAD_CHUNK_BYTES:
+                    await flush()
+            parser.finalize()
+            if not part.complete:
+                raise HTTPException(status_code=400, detail="Incomplete multipart body")
+            if not part.found:
+                raise HTTPException(status_code=422, detail="Missing multipart field 'file'")
+            await flush()
+        except BaseException:
+            tmp.close()
+            os.remove(path)
+            raise
+    return path, digest.hexdigest()
+
+# Documents the multipart body the handler parses itself (see upload_pdf)
+_UPLOAD_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+# ✅ PDF Upload Endpoint → size and concurrency are checked before the body is read (no File(...) parameter,
+# which would make FastAPI receive and spool the whole multipart body before the handler runs)
+@app.post("/upload", openapi_extra=_UPLOAD_BODY)
+async def upload_pdf(request: Request, background: bool = False, session_id: str | None = None):
+    # ✅ Each upload belongs to a session → new session unless the client continues one
+    session_id = _checked_session_id(session_id) or uuid.uuid4().hex
+    _check_upload_length(request)
+
+    if not ingestion_limiter.try_acquire():
+        raise HTTPException(status_code=429, detail="Too many uploads in progress, retry shortly")
+    released = False
 
     try:
-        contents = await file.read()
-        with pdfplumber.open(io.BytesIO(contents)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text and text.strip():
-                    extracted += text + "\n"
-                else:
-                    image = page.to_image(resolution=300).original
-                    text_ocr = pytesseract.image_to_string(image)
-                    if text_ocr.strip():
-                        extracted += text_ocr + "\n"
-
-        if not extracted.strip():
+        try:
+            path, file_hash = await _spool_upload(request)
+        except StarletteHTTPException:  # FastAPI's HTTPException is a subclass
+            raise
+        except Exception as e:
             return {
-                "error": "❌ PDF seems empty or unreadable.",
+                "error": f"❌ Failed to read upload: {str(e)}",
                 "extracted_text": ""
             }
 
-    except Exception as e:
-        return {
-            "error": f"❌ Failed to extract PDF: {str(e)}",
-            "extracted_text": ""
-        }
+        # ✅ Background mode → return immediately, poll /upload/status/{job_id}
+        if background:
+            job_id = extraction_jobs.submit(
+                path,
+                on_done=partial(_on_background_extracted, session_id),
+                on_finish=ingestion_limiter.release,
+                file_hash=file_hash,
+            )
+            released = True  # the job releases its slot when it finishes
+            return {
+                "message": "⏳ PDF accepted, extraction running in background.",
+                "job_id": job_id,
+                "session_id": session_id
+            }
+
+        try:
+            extracted = await pdf_extractor.aextract(path, file_hash=file_hash)
+
+            if not extracted.strip():
+                return {
+                    "error": "❌ PDF seems empty or unreadable.",
+                    "extracted_text": ""
+                }
+
+        except PageLimitExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            return {
+                "error": f"❌ Failed to extract PDF: {str(e)}",
+                "extracted_text": ""
+            }
+        finally:
+            os.remove(path)
 
-    pdf_text = extracted.strip()
-    rag_chain.load_pdf_text(pdf_text)
+        pdf_text = extracted.strip()
+        await run_in_threadpool(rag_chain.load_pdf_text, pdf_text, session_id)
+    finally:
+        if not released:
+            ingestion_limiter.release()
 
     return {
         "message": "✅ PDF uploaded and processed successfully.",
+        "session_id": session_id,
         "extracted_text": pdf_text[:1500]
     }
 
-# ✅ Ask endpoint for model interaction
+# ✅ Background extraction progress
+@app.get("/upload/status/{job_id}")
+async def upload_status(job_id: str):
+    job = extraction_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return {"job_id": job_id, **job}
+
+# ✅ Answer / search cache hit-rates and saved latency, knowledge-base index size
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "answers": rag_chain.answer_cache.stats(),
+        "search": rag_chain.search_cache.stats(),
+        "content": content_cache.stats(),
+        "knowledge_base": rag_chain.knowledge_base.stats()
+    }
+
+# ✅ Online evaluation → sampled / dropped / evaluated counts, per-route flag rates and score percentiles
+@app.get("/eval/stats")
+def eval_stats():
+    return rag_chain.evaluations.stats()
+
+# ✅ Readiness → per-component state + import/startup budget report + upstream circuit breakers
+@app.get("/ready")
+def ready():
+    report = readiness.report(READY_REQUIRES)
+    report["upstreams"] = upstream_states()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+# ✅ Prometheus scrape endpoint → stage / request latency histograms, route + cache + error counters
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# ✅ Ask endpoint for model interaction → a client without a session gets its own, never the shared default
 @app.post("/ask")
 async def ask_question(request: QueryRequest):
-    answer = rag_chain.run(request.question, request.context)
-    return {"answer": answer}
\ No newline at end of file
+    session_id = _checked_session_id(request.session_id) or uuid.uuid4().hex
+    answer = await rag_chain.arun(request.question, request.context, session_id)
+    return {"answer": answer, "session_id": session_id}
+
+def _sse(payload: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+# ✅ Streaming ask endpoint → Server-Sent Events
+@app.post("/ask/stream")
+async def ask_question_stream(request: QueryRequest):
+    session_id = _checked_session_id(request.session_id) or uuid.uuid4().hex
+
+    async def event_stream():
+        started = time.perf_counter()
+        ttft_ms = None
+        async for piece in rag_chain.astream(request.question, request.context, session_id):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+                STAGE_SECONDS.observe(ttft_ms / 1000, stage="stream_ttft")
+                log_event(logger, logging.INFO, "stream_first_token", ttft_ms=round(ttft_ms, 1))
+            yield _sse({"token": piece})
+        total_ms = (time.perf_counter() - started) * 1000
+        yield _sse({"ttft_ms": round(ttft_ms or total_ms, 1), "total_ms": round(total_ms, 1),
+                    "session_id": session_id}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-ID": session_id},
+    )
+
+readiness.record("import", time.perf_counter() - _IMPORT_STARTED)
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+import pytest
+
+from Backend.core.resilience import CircuitBreaker, Upstream, _retryable
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://serpapi.com/search")
+    return httpx.HTTPStatusError("status", request=request, response=httpx.Response(status, request=request))
+
+
+@pytest.mark.parametrize("error, expected", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ReadTimeout("slow"), True),
+    (httpx.ConnectError("refused"), True),
+    (ConnectionResetError(), True),
+    (_status_error(429), True),
+    (_status_error(503), True),
+    (_status_error(401), False),
+    (ValueError("Got error from SerpAPI: Invalid API key"), False),
+    (KeyError("organic_results"), False),
+])
+def test_only_upstream_health_errors_are_retryable(error, expected):
+    assert _retryable(error) is expected
+
+
+class Failing:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        raise self.error
+
+
+def _upstream(threshold: int = 2) -> Upstream:
+    return Upstream("test", max_concurrency=2, max_attempts=3, base_delay=0.001,
+                    breaker=CircuitBreaker("test", failure_threshold=threshold, reset_seconds=60))
+
+
+def test_bad_response_is_neither_retried_nor_counted_by_the_breaker():
+    upstream, fn = _upstream(), Failing(ValueError("Got error from SerpAPI: Invalid API key"))
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            upstream.call(fn, timeout=1)
+    assert fn.calls == 5
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_connection_errors_are_retried_and_open_the_breaker():
+    upstream, fn = _upstream(threshold=2), Failing(httpx.ConnectError("refused"))
+    with pytest.raises(httpx.ConnectError):
+        upstream.call(fn, timeout=1)
+    assert fn.calls == 2  # the second failure opens the breaker → no third attempt
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+
+
+def test_rejected_half_open_probe_lets_the_next_caller_probe():
+    upstream = _upstream(threshold=1)
+    with pytest.raises(httpx.ConnectError):
+        upstream.call(Failing(httpx.ConnectError("refused")), timeout=1)
+    upstream.breaker.reset_seconds = 0
+
+    async def bad_request():
+        raise _status_error(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(upstream.acall(bad_request, timeout=1))
+    assert upstream.breaker.allow()
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Pipeline.search_cache import SearchCache
+
+
+class CountingFetch:
+    """Blocking fake SerpAPI call: sleeps `delay`, then returns a result or raises."""
+
+    def __init__(self, delay: float = 0.1, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [f"{query}#{call}"]
+
+    async def acall(self, query: str):
+        return await asyncio.to_thread(self, query)
+
+
+def _concurrent_gets(cache: SearchCache, fetch, n: int) -> list:
+    outcomes = [None] * n
+
+    def worker(i):
+        try:
+            outcomes[i] = cache.get("Who won?", fetch)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def test_sync_concurrent_misses_share_one_fetch():
+    cache, fetch = SearchCache(), CountingFetch()
+    outcomes = _concurrent_gets(cache, fetch, 6)
+    assert fetch.calls == 1
+    assert all(o == ["Who won?#1"] for o in outcomes)
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 5
+
+
+def test_sync_leader_failure_is_shared_not_retried_by_waiters():
+    cache, fetch = SearchCache(), CountingFetch(delay=0.3, fail=True)
+    started = time.monotonic()
+    outcomes = _concurrent_gets(cache, fetch, 6)
+    assert fetch.calls == 1
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert time.monotonic() - started < 0.6  # one timeout, not one per waiter
+
+    # The next fresh call starts a new flight
+    fetch.fail = False
+    assert cache.get("who won", fetch) == ["who won#2"]
+    assert fetch.calls == 2
+
+
+def test_sync_stale_hit_is_served_and_revalidated_once():
+    cache, fetch = SearchCache(ttl=0.05, stale_ttl=10), CountingFetch(delay=0.1)
+    assert cache.get("q", fetch) == ["q#1"]
+    time.sleep(0.06)
+
+    started = time.monotonic()
+    assert cache.get("q", fetch) == ["q#1"]
+    assert cache.get("q", fetch) == ["q#1"]
+    assert time.monotonic() - started < 0.05  # stale answer without waiting for the refresh
+    time.sleep(0.2)
+    assert fetch.calls == 2
+    assert cache.get("q", fetch) == ["q#2"]
+
+
+def test_async_concurrent_misses_share_one_fetch():
+    cache, fetch = SearchCache(), CountingFetch()
+
+    async def run():
+        return await asyncio.gather(*(cache.aget("Who won?", fetch.acall) for _ in range(6)))
+
+    assert asyncio.run(run()) == [["Who won?#1"]] * 6
+    assert fetch.calls == 1
+
+
+def test_async_leader_failure_is_shared():
+    cache, fetch = SearchCache(), CountingFetch(fail=True)
+
+    async def run():
+        return await asyncio.gather(*(cache.aget("q", fetch.acall) for _ in range(4)), return_exceptions=True)
+
+    assert all(isinstance(o, RuntimeError) for o in asyncio.run(run()))
+    assert fetch.calls == 1
+
+
+def test_async_stale_hit_is_served_and_revalidated():
+    cache, fetch = SearchCache(ttl=0.05, stale_ttl=10), CountingFetch(delay=0.05)
+
+    async def run():
+        first = await cache.aget("q", fetch.acall)
+        await asyncio.sleep(0.06)
+        stale = await cache.aget("q", fetch.acall)
+        await asyncio.sleep(0.15)
+        return first, stale, await cache.aget("q", fetch.acall)
+
+    assert asyncio.run(run()) == (["q#1"], ["q#1"], ["q#2"])
+    assert fetch.calls == 2
+
+
+@pytest.mark.parametrize("result", [[], None])
+def test_empty_results_are_not_cached(result):
+    cache = SearchCache()
+    calls = []
+    cache.get("q", lambda q: calls.append(q) or result)
+    cache.get("q", lambda q: calls.append(q) or result)
+    assert len(calls) == 2